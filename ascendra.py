@@ -1,19 +1,11 @@
 import streamlit as st
-import csv
-import pandas as pd
-from collections import defaultdict
-from openai import OpenAI
-from datetime import datetime
-import re
-from fpdf import FPDF
-import textwrap
 import streamlit_authenticator as stauth
-import fitz  # PyMuPDF
 import io
-from io import BytesIO
-import tempfile
-import base64 
-import time
+import contextlib
+import uuid
+from assets import logo_data_uri
+from result_cache import ResultCache
+# 🐢 pandas, PyMuPDF, OpenAI and FPDF are imported where their feature is first used, so the login page renders fast
 
 # Initialize variables
 Primary_text = ""
@@ -22,18 +14,11 @@ Secondary_text = ""
 # Create a login screen for your public app (simulating private access)
 st.set_page_config(page_title="Benchmarking credentials using genAI", layout="centered")
 
-# Show logo in sidebar
-def get_base64_image(image_path):
-    with open(image_path, "rb") as img_file:
-        b64_data = base64.b64encode(img_file.read()).decode()
-    return f"data:image/png;base64,{b64_data}"
-
-img_data = get_base64_image("ascendra_v5.png")
-
+# Show logo in sidebar (downscaled and encoded once per process)
 st.sidebar.markdown(
     f"""
     <div style="text-align: center;">
-        <img src="{img_data}" width="200">
+        <img src="{logo_data_uri()}" width="200">
     </div>
     """,
     unsafe_allow_html=True
@@ -66,87 +51,34 @@ authenticator = stauth.Authenticate(
     cookie_expiry_days=1
 )
 
-# Parse oustide Streamlit flow 
-
-def parse_nqf_pdf_format(uploaded_file):
-    try:
-        uploaded_file.seek(0)
-        pdf_bytes = uploaded_file.read()
-
-        if isinstance(pdf_bytes, str):
-            raise TypeError("Expected bytes, got string.")
-
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-            text = "".join([page.get_text() for page in doc])
-    except Exception as e:
-        raise RuntimeError(f"Error while opening PDF: {e}")
-
-    lines = [line.strip() for line in text.splitlines() if line.strip()]
-
-    lines = [line for line in lines if not re.match(r'^\d+$', line)]
-    level_pattern = re.compile(r'(?:^|\s)NQF Level (One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten)', re.IGNORECASE)
-    domain_pattern = re.compile(r'^([a-j])\.\s+(.*?)(?=, in respect of)', re.IGNORECASE)
-
-    current_level = None
-    current_domain = None
-    descriptor_accumulator = ""
-    data = []
-
-    # Map level words to numbers
-    word_to_num = {
-        "One": "1", "Two": "2", "Three": "3", "Four": "4", "Five": "5",
-        "Six": "6", "Seven": "7", "Eight": "8", "Nine": "9", "Ten": "10"
-    }
+# One result cache per process, shared by every session
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
 
-    for line in lines:
-        level_match = level_pattern.search(line)
-        domain_match = domain_pattern.match(line)
+# One durable comparison history per process (SQLite; safe across sessions and threads)
+@st.cache_resource
+def get_comparison_store():
+    from comparison_store import ComparisonStore
+    return ComparisonStore()
 
-        if level_match:
-            if current_level and current_domain and descriptor_accumulator:
-                data.append((current_level, current_domain, descriptor_accumulator.strip()))
-                descriptor_accumulator = ""
-
-            # Convert to number using the lookup
-            level_word = level_match.group(1).capitalize()
-            current_level = word_to_num.get(level_word, level_word)  # Fallback to original if not found
-            current_domain = None
-
-        elif domain_match:
-            if current_level and current_domain and descriptor_accumulator:
-                data.append((current_level, current_domain, descriptor_accumulator.strip()))
-                descriptor_accumulator = ""
-            current_domain = domain_match.group(2).strip()
-
-        elif current_level and current_domain:
-            descriptor_accumulator += " " + line
-
-    if current_level and current_domain and descriptor_accumulator:
-        data.append((current_level, current_domain, descriptor_accumulator.strip()))
-
-    if not data:
-        raise RuntimeError("⚠️ No structured descriptors could be extracted from the PDF.")
-
-    temp_csv = tempfile.NamedTemporaryFile(delete=False, mode='w', newline='', suffix='.csv')
-    writer = csv.writer(temp_csv)
-    writer.writerow(["Level", "Domain", "Descriptor"])
-    writer.writerows(data)
-    temp_csv.close()
-
-    return data, temp_csv.name
+# Local similarity depends only on the two parsed frameworks, so compute it once per pair of uploads
+@st.cache_resource(max_entries=32)
+def get_similarity_matrix(primary_digest, secondary_digest, _Primary_levels, _Secondary_levels):
+    from similarity import similarity_matrix
+    return similarity_matrix(_Primary_levels, _Secondary_levels)
 
 # 🔐 Show login widget
 login_result = authenticator.login(form_name='Login', location='main')
-def get_base64_image(image_path):
-    with open(image_path, "rb") as img_file:
-        b64_data = base64.b64encode(img_file.read()).decode()
-    return f"data:image/png;base64,{b64_data}"
 
 if login_result is not None:
     name, auth_status, username = login_result
 
     if auth_status:
         authenticator.logout('Logout', location='sidebar')
+
+        from ingest import NoDescriptorsError, load_upload
+        from metrics import MetricsRecorder, record_stage
         # st.success(f"Welcome {name}")
 
         # --- Streamlit UI ---
@@ -159,6 +91,18 @@ if login_result is not None:
         # Input: OpenAI API key
         api_key = st.secrets["OPENAI_API_KEY"]
 
+        # 📊 Per-stage timings and token counts for this session (also appended to the metrics file)
+        if "metrics" not in st.session_state:
+            st.session_state.metrics = MetricsRecorder(session=f"{username}-{uuid.uuid4().hex[:8]}")
+        metrics = st.session_state.metrics
+
+        # ♻️ One pooled client per process: no new connection (and TLS handshake) per rerun
+        from llm_backend import get_backend
+        # 🚦 Requests queue per session (analysts share one login) within the account's RPM / TPM limits
+        client = get_backend(
+            api_key=api_key, rpm=st.secrets.get("ASCENDRA_LLM_RPM"), tpm=st.secrets.get("ASCENDRA_LLM_TPM"),
+        ).for_user(metrics.session)
+
         # ✅ INSERT HERE — Artefact type selection
         st.subheader("🧩 Artefact selection")
 
@@ -196,6 +140,42 @@ if login_result is not None:
             """,
             unsafe_allow_html=True
         )
+        # 🧠 Level descriptors are parsed; other PDFs (curricula, job descriptions, …) have their outcome
+        # statements found by pattern rules, or their learning outcomes extracted chunk by chunk by the model
+        # and condensed into one level where the rules find none (or the user asks for it)
+        def load_artefact_upload(uploaded_file, label):
+            try:
+                framework = load_upload(uploaded_file, metrics=metrics)
+            except NoDescriptorsError:
+                framework = None
+            if framework is not None and framework.extraction == "rules":
+                st.caption(f"📑 {len(framework.records)} outcome statements detected by pattern rules "
+                           f"(no model calls).")
+                if not st.checkbox("🧠 Extract the learning outcomes with the model instead", value=False,
+                                   key=f"{label}_model_extraction"):
+                    return framework
+            elif framework is not None:
+                return framework
+            from outcome_extraction import load_artefact
+            progress = st.progress(0.0, text=f"🧠 Extracting learning outcomes from the {label} artefact…")
+            framework, stats = load_artefact(
+                uploaded_file.getvalue(), uploaded_file.name,
+                client,
+                cache=get_result_cache(), metrics=metrics,
+                on_progress=lambda done, total: progress.progress(
+                    done / total, text=f"🧠 Extracting learning outcomes: {done} / {total} parts"),
+            )
+            progress.empty()
+            st.caption(f"🧠 Learning outcomes extracted from {stats['pages']} pages in {stats['chunks']} parts "
+                       f"({stats['cached_chunks']} from cache) and condensed into one level.")
+            return framework
+
+        # 🔍 Previews rerun only themselves and render from the already-parsed framework
+        @st.fragment
+        def framework_preview(framework, label):
+            if st.checkbox(f"🔍 Show {label} file preview", value=False):
+                st.dataframe(framework.preview())
+
         # --- 📦 Primary File Section Box ---
         with st.container():
             st.markdown(
@@ -205,36 +185,25 @@ if login_result is not None:
                 """,
                 unsafe_allow_html=True
             )
-        Primary_file = st.file_uploader("Upload primary artefact (CSV format)", type=["csv"])# Primary artefact type
+        Primary_file = st.file_uploader("Upload primary artefact (CSV or PDF)", type=["csv", "pdf"])# Primary artefact type
         st.session_state["primary_artefact_type"] = st.selectbox(
             "Select the type of the primary artefact:",
             artefact_types,
             key="primary_artefact_type_selectbox"
     ) 
 
+        # 📥 Parse each upload once per content hash; reruns reuse the cached framework
+        Primary_framework = None
         if Primary_file is not None:
             try:
-                # Read the file once
-                bytes_data = Primary_file.getvalue()
-                content = bytes_data.decode("utf-8-sig", errors="ignore")
+                Primary_framework = load_artefact_upload(Primary_file, "primary")
+                st.success("✅ Primary file loaded successfully.")
 
-                if not content.strip():
-                    st.error("❌ Uploaded Primary file is empty.")
-                else:
-                    file_buffer = io.StringIO(content)
-                    df_primary = pd.read_csv(file_buffer, on_bad_lines="skip")
-
-                    required_cols = {"Level", "Domain", "Descriptor"}
-                    if required_cols.issubset(df_primary.columns):
-                        st.success("✅ Primary file loaded successfully.")
-
-                        # ✅ Preview toggle
-                        if st.checkbox("🔍 Show Primary file preview", value=False):
-                            st.dataframe(df_primary.head())
-                            
-                    else:
-                        st.warning(f"⚠️ Missing required columns: {required_cols - set(df_primary.columns)}")
+                # ✅ Preview toggle
+                framework_preview(Primary_framework, "Primary")
 
+            except ValueError as e:
+                st.warning(f"⚠️ {e}")
             except Exception as e:
                 st.error(f"❌ Could not process Primary file: {e}")
         else:           
@@ -257,58 +226,24 @@ if login_result is not None:
             key="secondary_artefact_type_selectbox"
         )
 
+        Secondary_framework = None
         if Secondary_file is not None:
-            uploaded_file = Secondary_file  # ✅ Protect the original upload object
-
             try:
-                file_ext = uploaded_file.name.split(".")[-1].lower()
-
-                if file_ext == "csv":
-                    bytes_data = uploaded_file.getvalue()
-                    content = bytes_data.decode("utf-8-sig", errors="ignore")
-
-                    if not content.strip():
-                        st.error("❌ Uploaded Secondary CSV file is empty.")
-                    else:
-                        df_secondary = pd.read_csv(io.StringIO(content), on_bad_lines="skip")
-                        required_cols = {"Level", "Domain", "Descriptor"}
-                        if required_cols.issubset(df_secondary.columns):
-                            st.success("✅ Secondary CSV loaded successfully.")
-                            if st.checkbox("🔍 Show Secondary CSV preview", value=False):
-                                st.dataframe(df_secondary.head())
-                        else:
-                            st.warning(f"⚠️ Missing required columns: {required_cols - set(df_secondary.columns)}")
-
-                elif file_ext == "pdf":
-
-                    try:
-                        uploaded_file.seek(0)  # ✅ safe: this is a BytesIO object
-                        structured_data, csv_path = parse_nqf_pdf_format(uploaded_file)
-
-                        df_secondary = pd.read_csv(csv_path)
-                        # st.success(f"✅ Parsed {len(structured_data)} descriptors from PDF.")
-                        if st.checkbox("🔍 Show Secondary PDF preview", value=False):
-                            st.dataframe(df_secondary.head())
-
-                    except Exception as e:
-                        st.error(f"❌ Could not process Secondary PDF: {e}")
-
-                else:
-                    st.error("❌ Unsupported file format. Please upload a CSV or PDF.")
+                Secondary_framework = load_artefact_upload(Secondary_file, "secondary")
+                st.success(f"✅ Secondary {Secondary_framework.source.upper()} loaded successfully.")
+                framework_preview(Secondary_framework, "Secondary")
 
+            except ValueError as e:
+                st.warning(f"⚠️ {e}")
             except Exception as e:
-                st.error(f"❌ Unexpected error while handling Secondary file: {e}")
+                st.error(f"❌ Could not process Secondary file: {e}")
         else:
             st.info("📥 Please upload a secondary file to continue.")
         
-        if Primary_file and Secondary_file:
-            try:
-                # Compare byte content directly
-                if Primary_file.getvalue() == Secondary_file.getvalue():
-                    st.error("⚠️ You’ve uploaded the same file for both Primary and Secondary. Please upload two different files.")
-                    st.stop()  # 🚫 Prevents further execution
-            except Exception as e:
-                st.warning(f"⚠️ Could not compare files: {e}")
+        if Primary_framework and Secondary_framework:
+            if Primary_framework.content_digest == Secondary_framework.content_digest:
+                st.error("⚠️ You’ve uploaded the same file for both Primary and Secondary. Please upload two different files.")
+                st.stop()  # 🚫 Prevents further execution
 
         # Store uploaded files in st.session_state
 
@@ -318,187 +253,6 @@ if login_result is not None:
         if Secondary_file is not None:
             st.session_state['Secondary_file'] = Secondary_file
 
-        # Process Primary File
-        if Primary_file:
-            try:
-                extension = Primary_file.name.lower().split(".")[-1]
-                if extension == "csv":
-                    df_primary = pd.read_csv(Primary_file, encoding="utf-8-sig", on_bad_lines="skip")
-                    Primary_text = "\n".join(df_primary.iloc[:, 0].dropna().astype(str).tolist())
-                    # Load Primary levels
-                    if 'df_primary' in locals() and isinstance(df_primary, pd.DataFrame):
-                        if all(col in df_primary.columns for col in ['Level', 'Domain', 'Descriptor']):
-                            # Group by Level and Domain
-                            Primary_descriptors = (
-                                df_primary.groupby(['Level', 'Domain'])['Descriptor']
-                                .apply(lambda x: "\n".join(x.dropna()))
-                                .to_dict()
-                            )
-                        else:
-                            st.warning("⚠️ Primary CSV must have 'Level', 'Domain', and 'Descriptor' columns.")
-                elif extension == "pdf":
-                    Primary_text = extract_text_from_pdf(Primary_file)
-                else:
-                    st.warning("Unsupported file format for Primary artefact.")
-            except Exception as e:
-                st.error(f"❌ Could not process Primary file: {e}")
-
-            # ✅ Reusable function: Extract structured data and write to CSV
-            def parse_nqf_pdf_format(uploaded_file):
-                try:
-                    uploaded_file.seek(0)
-                    pdf_bytes = uploaded_file.read()
-                    if isinstance(pdf_bytes, str):
-                        raise TypeError("Expected bytes, got string.")
-                    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-                        text = "".join([page.get_text() for page in doc])
-                except Exception as e:
-                    raise RuntimeError(f"Error while opening PDF: {e}")
-
-                lines = [line.strip() for line in text.splitlines() if line.strip()]
-                lines = [line for line in lines if not re.match(r'^\d+$', line)]
-
-                level_pattern = re.compile(r'^\d{1,2}\.\s*NQF\s+Level\s+(One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten)', re.IGNORECASE)
-                domain_pattern = re.compile(r'^([a-jA-J])\.\s+(.*)', re.IGNORECASE)
-
-                current_level = None
-                current_domain = None
-                descriptor_accumulator = ""
-                data = []
-
-                word_to_num = {
-                    "One": "1", "Two": "2", "Three": "3", "Four": "4", "Five": "5",
-                    "Six": "6", "Seven": "7", "Eight": "8", "Nine": "9", "Ten": "10"
-                }
-
-                for line in lines:
-                    level_match = level_pattern.search(line)
-                    domain_match = domain_pattern.match(line)
-
-                    if level_match:
-                        level_word = level_match.group(1).capitalize()
-                        current_level = word_to_num.get(level_word, level_word)
-                        current_domain = None
-                        print(f"📘 Matched Level: {current_level} (from '{line}')")
-
-                        if current_level and current_domain and descriptor_accumulator:
-                            data.append((current_level, current_domain, descriptor_accumulator.strip()))
-                            descriptor_accumulator = ""
-
-                    elif domain_match:
-                        current_domain = domain_match.group(2).strip()
-                        print(f"📗 Matched Domain: {current_domain} (from '{line}')")
-
-                        if current_level and current_domain and descriptor_accumulator:
-                            data.append((current_level, current_domain, descriptor_accumulator.strip()))
-                            descriptor_accumulator = ""
-
-                    elif current_level and current_domain:
-                        descriptor_accumulator += " " + line
-
-                # Final flush
-                if current_level and current_domain and descriptor_accumulator:
-                    data.append((current_level, current_domain, descriptor_accumulator.strip()))
-
-                print(f"✅ Extracted {len(data)} descriptor entries.")
-
-                if not data:
-                    print("⚠️ No descriptors were extracted. Check if regex patterns are matching.")
-                    raise RuntimeError("⚠️ No structured descriptors could be extracted from the PDF.")
-
-                temp_csv = tempfile.NamedTemporaryFile(delete=False, mode='w', newline='', suffix='.csv')
-                writer = csv.writer(temp_csv)
-                writer.writerow(["Level", "Domain", "Descriptor"])
-                writer.writerows(data)
-                temp_csv.close()
-
-                return data, temp_csv.name
-
-        # Process Secondary File 
-        Secondary_levels = {}
-
-        def extract_descriptors_from_pdf_text_grouped(text):
-            """
-            Extracts descriptors from plain PDF text in the form:
-            Level → { Domain → Descriptor }
-            """
-            pattern = r"(Level\s*\d+)[\s\n]+(Knowledge|Skills|Autonomy|Responsibility|Competence)[\s\n]+(.+?)(?=(?:Level\s*\d+)|\Z)"
-            matches = re.findall(pattern, text, flags=re.DOTALL | re.IGNORECASE)
-
-            structured = {}
-            for level_raw, domain_raw, descriptor in matches:
-                level = level_raw.strip().title()
-                domain = domain_raw.strip().title()
-                desc = descriptor.strip().replace('\n', ' ')
-                structured.setdefault(level, {})[domain] = desc
-            return structured
-
-        if Secondary_file:
-            try:
-                file_ext = Secondary_file.name.lower().split(".")[-1]
-
-                if file_ext == "csv":
-                    df_secondary = pd.read_csv(Secondary_file, encoding="utf-8-sig", on_bad_lines="skip")
-                    if all(col in df_secondary.columns for col in ['Level', 'Domain', 'Descriptor']):
-                            Secondary_levels = {}
-
-                            # Group by both Level and Domain
-                            grouped = df_secondary.groupby(['Level', 'Domain'])['Descriptor'].apply(lambda x: "\n".join(x.dropna()))
-                            for (level, domain), descriptor in grouped.items():
-                                Secondary_levels.setdefault(level, {})[domain] = descriptor
-
-                            # Additionally allow selecting by Level only (combine all domains under that level)
-                            level_grouped = df_secondary.groupby('Level')['Descriptor'].apply(lambda x: "\n".join(x.dropna()))
-                            for level, descriptors in level_grouped.items():
-                                Secondary_levels.setdefault(f"{level} (All Domains)", {})["Combined"] = descriptors
-
-                    else:
-                        st.warning("⚠️ Secondary CSV missing required columns.")
-
-                elif file_ext == "pdf":
-
-                    # ✅ Always reset file pointer before reading
-                    Secondary_file.seek(0)
-
-                    # ✅ Correct parser name
-                    structured_data, csv_path = parse_nqf_pdf_format(uploaded_file)
-
-                    if structured_data:
-                        # st.success(f"✅ Parsed {len(structured_data)} levels from PDF.")
-                        # st.write(structured_data)
-
-                        if csv_path:
-                            with open(csv_path, "rb") as f:
-                                # st.download_button("⬇️ Download Extracted CSV", f, file_name="secondary_descriptors.csv")
-                                # ✅ Automatically load parsed CSV into df_secondary
-                                df_secondary = pd.read_csv(csv_path)
-
-                                # ✅ Normalize level format
-                                df_secondary['Level'] = df_secondary['Level'].apply(lambda x: f"Level {int(x)}")
-
-                                # ✅ Check and group descriptors
-                                if all(col in df_secondary.columns for col in ['Level', 'Domain', 'Descriptor']):
-                                    grouped = df_secondary.groupby(['Level', 'Domain'])['Descriptor'].apply(lambda x: "\n".join(x.dropna()))
-                                    
-                                    for (level, domain), descriptor in grouped.items():
-                                        Secondary_levels.setdefault(level, {})[domain] = descriptor
-
-                                    st.success(f"✅ Secondary PDF loaded successfully.")
-                                else:
-                                    st.warning("⚠️ Extracted CSV is missing required columns.")
-
-                    else:
-                        st.warning("⚠️ PDF parsing returned no valid structured descriptors.")
-
-                else:
-                    st.warning("⚠️ Unsupported file format for Secondary artefact.")
-
-            except Exception as e:
-                st.error(f"❌ Could not process Secondary file: {e}")
-
-        # Match threshold slider
-        high_match_threshold = st.slider("Set threshold for improved calibration", min_value=50, max_value=100, value=80)
-
         # Session state for results
         if "results" not in st.session_state:
             st.session_state.results = []
@@ -506,43 +260,15 @@ if login_result is not None:
         # Primary_file = st.file_uploader("Upload Primary Artefact", key="primary")
         # Secondary_file = st.file_uploader("Upload Secondary Artefact", key="secondary")
         
-        # If all inputs are available
-        if api_key and Primary_file and Secondary_file:
-            client = OpenAI(api_key=api_key)
-                             
-        # ✅ Build a dictionary of levels to their descriptors with "Level X" format
-        
-        Primary_levels = {}
-
-        if 'df_primary' in locals() and isinstance(df_primary, pd.DataFrame):
-            if all(col in df_primary.columns for col in ['Level', 'Domain', 'Descriptor']):
-                
-                # ✅ Normalize Level values to "Level X" format
-                df_primary['Level'] = df_primary['Level'].apply(lambda x: f"Level {int(x)}" if str(x).isdigit() else str(x))
-                
-                # ✅ Group and build nested dictionary
-                grouped = df_primary.groupby(['Level', 'Domain'])['Descriptor'].apply(lambda x: "\n".join(x.dropna()))
-                for (level, domain), descriptor in grouped.items():
-                    Primary_levels.setdefault(level, {})[domain] = descriptor
-
-            else:
-                st.warning("⚠️ Primary CSV must include 'Level', 'Domain', and 'Descriptor' columns.")
-
-        Secondary_levels = {}
-
-        if 'df_secondary' in locals() and isinstance(df_secondary, pd.DataFrame):
-            if all(col in df_secondary.columns for col in ['Level', 'Domain', 'Descriptor']):
-                
-                # ✅ Normalize Level values to "Level X" format
-                df_secondary['Level'] = df_secondary['Level'].apply(lambda x: f"Level {int(x)}" if str(x).isdigit() else str(x))
-
-                # ✅ Group by Level and Domain
-                grouped = df_secondary.groupby(['Level', 'Domain'])['Descriptor'].apply(lambda x: "\n".join(x.dropna()))
-                for (level, domain), descriptor in grouped.items():
-                    Secondary_levels.setdefault(level, {})[domain] = descriptor
-
-            else:
-                st.warning("⚠️ Secondary CSV must include 'Level', 'Domain', and 'Descriptor' columns.") 
+        # ✅ Level → {Domain → Descriptor} with "Level X" format, straight from the parsed frameworks
+        Primary_levels = Primary_framework.levels if Primary_framework else {}
+        Secondary_levels = Secondary_framework.levels if Secondary_framework else {}
+
+        if Secondary_framework is not None:
+            from comparison import run_comparison
+            from crosswalk import DEFAULT_CONCURRENCY, all_pairs, crosswalk_matrix, run_crosswalk, style_heatmap
+            from similarity import rank_candidates, shortlist_pairs
+            from scoring import score_circles
             
             # --- Primary & Secondary UI ---
 
@@ -556,6 +282,33 @@ if login_result is not None:
             
             elif Secondary_file and not Secondary_levels:
                 st.warning("⚠️ No valid Secondary descriptors found.")
+
+            # 🔎 Instant provisional ranking from local text similarity (no GPT call)
+            local_similarity = None     # also shortlists the crosswalk; only there when both sides have levels
+            if Primary_levels and Secondary_levels:
+                local_similarity = get_similarity_matrix(
+                    Primary_framework.digest, Secondary_framework.digest, Primary_levels, Secondary_levels
+                )
+                candidates = rank_candidates(local_similarity, selected_Primary_level, top_k=3)
+                st.caption(
+                    "🔎 Provisional closest Secondary levels (local text similarity): "
+                    + ", ".join(f"{level} ({score:.0f}%)" for level, score in candidates.items())
+                )
+
+                # 🗄️ Indexed lookup: has this exact pair of levels from these two files been compared before?
+                previous = get_comparison_store().lookup(
+                    Primary_framework.digest, Secondary_framework.digest, selected_Primary_level, selected_Secondary_level
+                )
+                if previous:
+                    st.caption(f"🗄️ Compared before on {previous['created_at'][:10]} "
+                               f"(score {previous['score'] if previous['score'] is not None else 'N/A'}); "
+                               "see Comparison history below.")
+
+            def store_result(row):
+                get_comparison_store().add(
+                    row, Primary_framework.digest, Secondary_framework.digest,
+                    primary_name=Primary_file.name, secondary_name=Secondary_file.name, session=metrics.session,
+                )
         
             # # Show taxonomy selector once both files are uploaded and parsed ---
 
@@ -574,199 +327,265 @@ if login_result is not None:
                         "OFO (Organising Framework for Occupations - South Africa)"
                     ]
 
-                    selected_taxonomies = st.multiselect(
-                        label="Select a taxonomy or classification system",
-                        options=taxonomy_options
-                    )
+                    # 🧭 Only the next prompt depends on the taxonomies, so changing them reruns just this selector
+                    @st.fragment
+                    def taxonomy_selector():
+                        st.session_state['selected_taxonomies'] = st.multiselect(
+                            label="Select a taxonomy or classification system",
+                            options=taxonomy_options,
+                            key="taxonomy_multiselect",
+                        )
 
-                    st.session_state['selected_taxonomies'] = selected_taxonomies
+                    taxonomy_selector()
                                
-            # Compare levels
-          
-            if st.button("Compare Levels"):
-                Primary_text = "".join(Primary_levels[selected_Primary_level])
-                Secondary_text = "".join(Secondary_levels[selected_Secondary_level])
-
-            # PROMPT GPT #1 >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-
-                prompt = f"""
-
-                    Task: Conduct a structured comparison between the learning outcomes contained in two artefacts.
-
-                    Use the following definition of a learning outcome as a point of departure: 
-                    The totality of information, knowledge, understanding, attitudes, values, skills, competencies or behaviours an individual is expected to master upon successful completion of an educational programme.
-                    
-                    Examples of artefacts you can expect include: 
-
-                    Qualifications
-                    Level descriptor
-                    Curriculum
-                    Job description
-                    Performance contract
-                    Occupational standard
-                    Professional standard
-                    Microcredentials
-                    Curriculum Vitae
-
-                    Primary Level {selected_Primary_level}:
-                    {Primary_text}
-                    Secondary Level {selected_Secondary_level}:
-                    {Secondary_text}
-
-                    Instructions:
-                    
-                    Compare the learning outcomes using the following dimensions:
+            # 🧩 Knowledge↔Knowledge, Skills↔Skills, … as small parallel prompts, weighted into the level score
+            per_domain = st.checkbox(
+                "🧩 Compare domain by domain (smaller parallel prompts, weighted into the level score)", value=False,
+            )
+            domain_weights = None
+            if per_domain:
+                from domain_comparison import DIMENSIONS, run_domain_comparison
+                with st.expander("⚖️ Domain weights"):
+                    weight_cols = st.columns(len(DIMENSIONS))
+                    domain_weights = {
+                        dimension: col.number_input(dimension, min_value=0.0, max_value=10.0, value=1.0, step=0.5,
+                                                    key=f"domain_weight_{dimension}")
+                        for col, dimension in zip(weight_cols, DIMENSIONS)
+                    }
+
+            # 🎲 Several answers from one request: median score, spread and agreement on the recommended level
+            consensus = st.checkbox(
+                "🎲 Consensus of several answers (one request; median score, spread and level agreement)",
+                value=False, disabled=per_domain,
+            ) and not per_domain
+            consensus_samples, early_stop = 1, True
+            if consensus:
+                from consensus import DEFAULT_SAMPLES, MAX_SAMPLES, run_consensus
+                samples_col, early_stop_col = st.columns(2)
+                consensus_samples = samples_col.number_input(
+                    "Answers per comparison", min_value=2, max_value=MAX_SAMPLES, value=DEFAULT_SAMPLES,
+                )
+                early_stop = early_stop_col.checkbox(
+                    "Stop early when the first answers agree", value=True,
+                    help="Asks for two answers first and for the rest only if their scores or levels differ.",
+                )
+
+            # 🧾 JSON answers: score, recommended level and per-domain scores without regex scraping
+            structured_output = st.checkbox(
+                "🧾 Structured answers (score, recommended level and per-domain scores)", value=True,
+                disabled=per_domain or consensus,
+            ) or per_domain or consensus
+
+            # 🗺️ Full crosswalk: every Primary level against every Secondary level
+            with st.expander("🗺️ Full crosswalk (all level pairs)"):
+                st.caption("Runs every Primary × Secondary comparison in parallel and fills in the heatmap as results arrive.")
+                crosswalk_concurrency = st.slider("Parallel requests", min_value=1, max_value=16, value=DEFAULT_CONCURRENCY)
+                crosswalk_top_k = st.number_input(
+                    "Only send the k locally most similar Secondary levels per Primary level to GPT (0 = all)",
+                    min_value=0, max_value=len(Secondary_levels), value=0, disabled=local_similarity is None,
+                )
+
+                if st.button("Run full crosswalk"):
+                    if crosswalk_top_k and local_similarity is not None:
+                        pairs = shortlist_pairs(local_similarity, crosswalk_top_k)
+                    else:
+                        pairs = all_pairs(Primary_levels, Secondary_levels)
+                    progress = st.progress(0.0, text=f"0 / {len(pairs)} comparisons")
+                    heatmap = st.empty()
+                    crosswalk_results = []
+
+                    for row in run_crosswalk(
+                        client, Primary_levels, Secondary_levels, pairs=pairs,
+                        max_workers=crosswalk_concurrency,
+                        taxonomies=st.session_state.get('selected_taxonomies', []),
+                        cache=get_result_cache(),
+                        structured=structured_output,
+                        metrics=metrics,
+                        per_domain=per_domain,
+                        domain_weights=domain_weights,
+                        samples=consensus_samples,
+                        early_stop=early_stop,
+                    ):
+                        crosswalk_results.append(row)
+                        if "Error" in row:
+                            st.warning(f"⚠️ {row['Primary Level']} → {row['Secondary Level']}: {row['Error']}")
+                        else:
+                            st.session_state.results.append(row)
+                            store_result(row)
+                        queued = client.scheduler.pending() if client.scheduler else 0
+                        progress.progress(
+                            len(crosswalk_results) / len(pairs),
+                            text=f"{len(crosswalk_results)} / {len(pairs)} comparisons"
+                                 + (f" · {queued} requests waiting in the shared queue" if queued else ""),
+                        )
+                        heatmap.dataframe(style_heatmap(crosswalk_matrix(crosswalk_results, Primary_levels, Secondary_levels)))
+
+                    cache_hits = sum(1 for row in crosswalk_results if row.get("Cached"))
+                    prompt_tokens = sum(row.get("Prompt Tokens", 0) for row in crosswalk_results)
+                    cached_tokens = sum(row.get("Cached Tokens", 0) for row in crosswalk_results)
+                    st.success(
+                        f"✅ Crosswalk complete ({cache_hits} of {len(pairs)} served from cache; "
+                        f"{cached_tokens:,} of {prompt_tokens:,} prompt tokens hit the provider's prompt cache)."
+                    )
 
-                    Knowledge: Depth, breadth, and type (factual, theoretical, procedural, etc.)
+            # 🎯 Ordinal search: start at the local estimate and move up or down on the model's verdict
+            if Primary_levels and Secondary_levels and st.button(
+                f"🎯 Find the best-matching Secondary level for {selected_Primary_level}"
+            ):
+                from level_search import search_best_level
+                verdict_text = {
+                    "higher": "⬆️ Primary level is higher — looking further up",
+                    "lower": "⬇️ Primary level is lower — looking further down",
+                    "equivalent": "✅ equivalent",
+                }
 
-                    Skills: Cognitive, practical, and problem-solving abilities
+                def show_search_step(step):
+                    st.markdown(f"**{step['Secondary Level']}**: {verdict_text[step['Verdict']]} "
+                                f"(score {step['Similarity Score']}{', cached' if step['Cached'] else ''}) — {step['Rationale']}")
 
-                    Autonomy and Responsibility: Level of independence, decision-making, and responsibility in application
+                with st.status(f"Searching {len(Secondary_levels)} Secondary levels from {candidates.index[0]}…",
+                               expanded=True) as search_status:
+                    try:
+                        search = search_best_level(
+                            client, selected_Primary_level, Primary_levels[selected_Primary_level], Secondary_levels,
+                            start=candidates.index[0],
+                            taxonomies=st.session_state.get('selected_taxonomies', []),
+                            cache=get_result_cache(),
+                            metrics=metrics,
+                            on_step=show_search_step,
+                        )
+                        search_status.update(
+                            label=f"🎯 Best match for {selected_Primary_level}: {search['Best Level']} "
+                                  f"(score {search['Similarity Score']}) — {search['Model Calls']} model call(s) "
+                                  f"for {search['Levels']} Secondary levels",
+                            state="complete",
+                        )
+                    except Exception as e:
+                        search_status.update(label=f"❌ Search failed: {e}", state="error")
+                st.caption("Select the best match above and click Compare Levels for the full comparison.")
 
-                    Reference Bloom’s taxonomy for knowledge, the Structure of the Observed Learning Outcome (SOLO) taxonomy, and the the Dreyfus model of skills acquisition where applicable
+            # Compare levels
+          
+            stream_response = st.checkbox(
+                f"⚡ Stream the {client.model} answer as it is written", value=True, disabled=structured_output,
+                help="Only available for free-text answers.",
+            ) and not structured_output
 
-                    Assess the degree of equivalence between the levels of the two sets of learning outcomes.
+            if st.button("Compare Levels"):
 
-                    Highlight key similarities and differences in terms of learning outcomes, complexity, autonomy, and context of learning or application.
+            # PROMPT GPT #1 >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 
-                    Based on your analysis, recommend the most appropriate level from the secondary framework that best aligns with the Primary Level descriptor. Justify your recommendation clearly.
-                    
-                    Provide a similarity score out of 100. Write this as a separate score below your response. 
-                    
-                    Add a visual depiction with one row of 10 circles sized double the height of the text. Fill the circles in red to match the score out of 100 proportionally, starting from the left. Keep the other circles unfilled. Do not use a heading for the visual depiction.
+                st.subheader(f"Comparison Result: Primary Level {selected_Primary_level} - Secondary Level {selected_Secondary_level}")
+
+                with st.expander("View compared descriptors"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown(f"**Primary Level {selected_Primary_level}**")
+                        for item in Primary_levels[selected_Primary_level]:
+                            st.markdown(f"- {item}")
+                    with col2:
+                        st.markdown(f"**Secondary Level {selected_Secondary_level}**")
+                        for item in Secondary_levels[selected_Secondary_level]:
+                            st.markdown(f"- {item}")
+
+                # Streaming renders tokens straight into the page, so no blocking spinner is needed
+                # 🚦 Shows where this request stands while other sessions' requests are ahead of it
+                queue_status = st.empty()
+
+                def show_queue_position(position):
+                    if position:
+                        queue_status.info(f"⏳ {position} request(s) ahead of yours in the shared queue…")
+                    else:
+                        queue_status.info("⏳ You're next — waiting for the account's rate limit to allow the request…")
 
-                """
-                with st.spinner("Asking GPT-4o..."):
+                with (contextlib.nullcontext() if stream_response else st.spinner(f"Asking {client.model}...")):
                     try:
-                        response = client.chat.completions.create(
-                            model="gpt-4o",
-                            messages=[
-
-                            # PROMPT GPT #2 >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-
-                                {
-                                    "role": "system",
-                                    "content": """You are a senior expert in qualifications frameworks, international education systems, and workforce development policy. You have decades of experience analyzing and comparing learning outcomes across diverse artefacts and contexts. Your expertise extends beyond qualifications to include level descriptors, curricula, job descriptions, performance contracts, occupational standards, professional standards, CVs, and microcredentials. You are well-versed in regional and global frameworks such as the European Qualifications Framework (EQF), the African Continental Qualifications Framework (ACQF), the South African NQF, and others.
-                                    You operate from the following definition of a learning outcome: *'the totality of information, knowledge, understanding, attitudes, values, skills, competencies, or behaviours an individual is expected to master upon successful completion of an educational programme.'*
-                                    You apply advanced learning taxonomies—including the revised Bloom’s taxonomy, SOLO taxonomy, and the Dreyfus model of skill acquisition—to assess complexity, autonomy, responsibility, and transferability. In addition to your policy and domain expertise, you are highly experienced in the use of large language models (LLMs) to compare and align learning outcomes expressed in different artefacts. You understand how to leverage LLMs to interpret semantic nuance, identify equivalences, and generate structured, domain-based comparisons. Your role is to evaluate the alignment between artefacts, highlight key similarities and differences, and recommend the most appropriate mappings—applying both human and AI-enabled analytical judgment."""
-                                },
-                                {
-                                    "role": "user",
-                                    "content": prompt
-                                }
-                            ]
+                        # ⚡ Reuse a previous answer for the exact same descriptors, prompt and model
+                        # 🚦 Per-domain answers are requested from worker threads, which cannot update the page;
+                        # their wait is shown once up front from the shared queue instead
+                        if per_domain:
+                            queued = client.scheduler.pending() if client.scheduler else 0
+                            if queued:
+                                queue_status.info(f"⏳ {queued} request(s) waiting in the shared queue…")
+                        compare_args = (
+                            client if per_domain else client.for_user(metrics.session, on_wait=show_queue_position),
+                            selected_Primary_level, Primary_levels[selected_Primary_level],
+                            selected_Secondary_level, Secondary_levels[selected_Secondary_level],
                         )
-
-                        result_text = response.choices[0].message.content
+                        compare_options = dict(
+                            taxonomies=st.session_state.get('selected_taxonomies', []),
+                            cache=get_result_cache(),
+                            metrics=metrics,
+                        )
+                        if per_domain:
+                            result_row = run_domain_comparison(*compare_args, weights=domain_weights, **compare_options)
+                        elif consensus:
+                            result_row = run_consensus(*compare_args, samples=consensus_samples, early_stop=early_stop,
+                                                       **compare_options)
+                        else:
+                            result_row = run_comparison(
+                                *compare_args,
+                                stream_to=st.write_stream if stream_response else None,
+                                structured=structured_output,
+                                **compare_options,
+                            )
+                        queue_status.empty()
+                        result_text = result_row["Response"]
+                        if result_row["Cached"]:
+                            st.caption(f"⚡ Cache hit — reused a previous {client.model} answer (no tokens spent).")
+                        else:
+                            st.caption(
+                                f"🆕 Cache miss — fresh {client.model} answer. {result_row['Prompt Tokens']:,} prompt tokens "
+                                f"({result_row['Cached Tokens']:,} served from the provider's prompt cache), "
+                                f"{result_row['Completion Tokens']:,} completion tokens."
+                            )
 
                         if result_text:
-                            match = re.search(r"similarity score[^\d]*(\d{1,3})", result_text, re.IGNORECASE)
-                            ai_score = int(match.group(1)) if match else None
-
-                            st.subheader(f"Comparison Result: Primary Level {selected_Primary_level} - Secondary Level {selected_Secondary_level}")
-
-                            with st.expander("View compared descriptors"):
-                                col1, col2 = st.columns(2)
-                                with col1:
-                                    st.markdown(f"**Primary Level {selected_Primary_level}**")
-                                    for item in Primary_levels[selected_Primary_level]:
-                                        st.markdown(f"- {item}")
-                                with col2:
-                                    st.markdown(f"**Secondary Level {selected_Secondary_level}**")
-                                    for item in Secondary_levels[selected_Secondary_level]:
-                                        st.markdown(f"- {item}")
-
-                            st.write(result_text)
-
-                            from fpdf import FPDF
-                            import io
-                            from datetime import datetime
-                            from fpdf.enums import XPos, YPos
-
-                            class PDFWithFooter(FPDF):
-                                def footer(self):
-                                    self.set_y(-15)
-                                    self.set_font("DejaVu", "I", 8)
-                                    self.set_text_color(128)
-                                    self.cell(0, 10, "Powered by Ascendra | Version 1.0 – April 2025 – Results should be interpreted as advisory", 0, 0, "C")
-
-                            def safe_multicell(pdf_obj, width, height, text):
-                                import re
-                                if not text:
-                                    return
-                                words = re.split(r'(\s+)', str(text))
-                                current_line = ''
-                                for word in words:
-                                    chunk = current_line + word
-                                    if pdf_obj.get_string_width(chunk) > pdf_obj.w - 2 * pdf_obj.l_margin:
-                                        pdf_obj.multi_cell(width, height, current_line.strip(), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-                                        current_line = word
-                                    else:
-                                        current_line += word
-                                if current_line.strip():
-                                    pdf_obj.multi_cell(width, height, current_line.strip(), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                            # Streamed answers are already on the page
+                            if result_row["Cached"] or not stream_response:
+                                st.write(result_text)
+
+                            # 🔴 Score bar and per-domain scores rendered locally from the JSON answer
+                            if structured_output and isinstance(result_row["Similarity Score"], int):
+                                st.markdown(f"### Similarity score: {result_row['Similarity Score']}/100")
+                                st.markdown(f"<span style='font-size:2em'>{score_circles(result_row['Similarity Score'])}</span>",
+                                            unsafe_allow_html=True)
+                                if result_row["Recommended Level"]:
+                                    st.markdown(f"**Recommended Secondary level:** {result_row['Recommended Level']}")
+                                if result_row.get("Sample Scores"):
+                                    st.caption(
+                                        f"🎲 Median of {len(result_row['Sample Scores'])} answers "
+                                        f"({', '.join(map(str, result_row['Sample Scores']))}); spread "
+                                        f"{result_row['Score Spread']} points; {result_row['Level Agreement']:.0%} "
+                                        f"recommend {result_row['Recommended Level']}."
+                                    )
+                                if result_row["Domain Scores"]:
+                                    domain_cols = st.columns(len(result_row["Domain Scores"]))
+                                    for col, (domain, score) in zip(domain_cols, result_row["Domain Scores"].items()):
+                                        col.metric(domain, f"{score}/100")
 
                             # --- Create PDF ---
-                            pdf = PDFWithFooter()
-                            pdf.add_page()
-
-                            # Fonts
-                            pdf.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
-                            pdf.add_font('DejaVu', 'B', 'DejaVuSans-Bold.ttf', uni=True)
-                            pdf.add_font('DejaVu', 'I', 'DejaVuSans-Oblique.ttf', uni=True)
-                            pdf.set_font("DejaVu", size=8)
-
-                            # Header
-                            pdf.image("ascendra_v5.png", x=10, y=8, w=40)
-                            pdf.ln(45)
-                            pdf.set_font("DejaVu", "B", 14)
-                            safe_multicell(pdf, 0, 8, "Primary - Secondary Comparison Report")
-                            pdf.set_font("DejaVu", "", 8)
-                            safe_multicell(pdf, 0, 8, datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"))
-                            pdf.ln(10)
-
-                            # Primary Level
-                            pdf.set_font("DejaVu", "B", 12)
-                            safe_multicell(pdf, 0, 8, f"Primary Level {selected_Primary_level}")
-                            pdf.set_font("DejaVu", "", 8)
-                            for item in Primary_levels[selected_Primary_level]:
-                                safe_multicell(pdf, 0, 8, f"• {item}")
-                            pdf.ln(5)
-
-                            # Secondary Level
-                            pdf.set_font("DejaVu", "B", 12)
-                            safe_multicell(pdf, 0, 8, f"Secondary Level {selected_Secondary_level}")
-                            pdf.set_font("DejaVu", "", 8)
-                            for item in Secondary_levels[selected_Secondary_level]:
-                                safe_multicell(pdf, 0, 8, f"• {item}")
-                            pdf.ln(5)
-
-                            # GPT Result
-                            pdf.set_font("DejaVu", "B", 12)
-                            safe_multicell(pdf, 0, 8, "GPT Comparison Result:")
-                            pdf.set_font("DejaVu", "", 8)
-                            safe_multicell(pdf, 0, 8, result_text)
-                            pdf.ln(5)
-
-                            # Convert to BytesIO
-                            pdf_bytes = io.BytesIO(pdf.output(dest='S'))
-
-                            st.session_state.results.append({
-                                "Primary Level": selected_Primary_level,
-                                "Secondary Level": selected_Secondary_level,
-                                "Similarity Score": ai_score if ai_score else "N/A",
-                                "Response": result_text,
-                                "Timestamp": datetime.utcnow().isoformat()
-                            })
+                            from report import build_comparison_report
+                            with record_stage(metrics, "pdf_report", comparisons=1) as stage:
+                                pdf_bytes = io.BytesIO(build_comparison_report(
+                                    selected_Primary_level, Primary_levels[selected_Primary_level],
+                                    selected_Secondary_level, Secondary_levels[selected_Secondary_level],
+                                    result_text, score=result_row["Similarity Score"] if structured_output else None,
+                                ))
+                                stage["bytes"] = pdf_bytes.getbuffer().nbytes
+
+                            st.session_state.results.append(result_row)
+                            store_result(result_row)
 
                             # ✅ Show CSV export button right after results are stored
                             if st.session_state.results:
-                                df = pd.DataFrame(st.session_state.results)
+                                # Streamed out of the store only when clicked, instead of on every rerun
                                 st.download_button(
                                     label="📥 Download comparison as CSV",
-                                    data=df.to_csv(index=False).encode("utf-8"),
+                                    data=lambda: get_comparison_store().csv_bytes(session=metrics.session),
                                     file_name="Primary_Secondary_comparisons.csv",
-                                    mime="text/csv"
+                                    mime="text/csv",
+                                    on_click="ignore",
                                 )
 
                             # PDF Download Button
@@ -790,6 +609,109 @@ if login_result is not None:
                     except Exception as e:
                         st.error(f"❌ API Error: {e}")
 
+            # 📚 One PDF with every comparison in this session, rendered off the script thread
+            if st.session_state.results:
+                st.subheader("📚 All comparisons this session")
+                if st.button(f"🖨️ Prepare report of all {len(st.session_state.results)} comparisons"):
+                    from report import submit_batch_report
+                    st.session_state.batch_report_job = submit_batch_report(
+                        st.session_state.results, Primary_levels, Secondary_levels, metrics=metrics
+                    )
+
+                # ⏳ Polls only while the report is rendering; once it is done, one full rerun stops the polling
+                report_job = st.session_state.get("batch_report_job")
+                report_pending = report_job is not None and not report_job.done()
+
+                @st.fragment(run_every=2 if report_pending else None)
+                def batch_report_status():
+                    job = st.session_state.get("batch_report_job")
+                    if job is None:
+                        return
+                    if not job.done():
+                        st.info("⏳ Rendering the report in the background — you can keep working.")
+                    elif report_pending:
+                        st.rerun()
+                    elif job.exception():
+                        st.error(f"❌ Could not build the report: {job.exception()}")
+                    else:
+                        st.download_button(
+                            label="📄 Download all comparisons as PDF",
+                            data=job.result,
+                            file_name="Primary_Secondary_comparisons.pdf",
+                            mime="application/pdf",
+                            on_click="ignore",
+                        )
+
+                batch_report_status()
+
+                # 🎯 The threshold only re-classifies scores already in the session; nothing is recomputed
+                @st.fragment
+                def match_classification():
+                    threshold = st.slider("Set threshold for improved calibration", min_value=50, max_value=100,
+                                          value=80, key="high_match_threshold")
+                    import pandas as pd
+                    scored = pd.DataFrame(
+                        [row for row in st.session_state.results if isinstance(row.get("Similarity Score"), int)],
+                        columns=["Primary Level", "Secondary Level", "Similarity Score"],
+                    )
+                    if scored.empty:
+                        return
+                    scored["Match"] = ["✅ High match" if score >= threshold else "—" for score in scored["Similarity Score"]]
+                    st.caption(f"{(scored['Similarity Score'] >= threshold).sum()} of {len(scored)} scored comparisons "
+                               f"at or above {threshold}.")
+                    st.dataframe(scored, hide_index=True)
+
+                match_classification()
+
+        # 🗄️ Every stored comparison, searchable and exportable without re-running GPT
+        @st.fragment
+        def comparison_history():
+            store = get_comparison_store()
+            with st.expander(f"🗄️ Comparison history ({store.count():,} stored)"):
+                query = st.text_input("Search responses (e.g. autonomy AND supervision)", key="history_query")
+                filters = {}
+                if Primary_framework and Secondary_framework and st.checkbox(
+                    "Only comparisons of the two uploaded files", key="history_current_files"
+                ):
+                    filters = {"primary_framework": Primary_framework.digest,
+                               "secondary_framework": Secondary_framework.digest}
+                page_size = 25
+                page = st.number_input("Page", min_value=1, value=1, key="history_page")
+                if query.strip():
+                    rows = store.search(query, limit=page_size, offset=(page - 1) * page_size, **filters)
+                    st.caption(f"{len(rows)} matches on page {page}")
+                else:
+                    rows, total = store.history(page=page, page_size=page_size, **filters)
+                    st.caption(f"Page {page} of {max(1, -(-total // page_size))} ({total:,} comparisons)")
+                if rows:
+                    import pandas as pd
+                    columns = ["created_at", "primary_name", "primary_level", "secondary_name", "secondary_level",
+                               "score", "recommended_level", "snippet" if query.strip() else "model"]
+                    st.dataframe(pd.DataFrame(rows)[columns], hide_index=True)
+
+                col1, col2 = st.columns(2)
+                col1.download_button("📥 Export as CSV", data=lambda: store.csv_bytes(**filters),
+                                     file_name="ascendra_comparisons.csv", mime="text/csv", on_click="ignore")
+                col2.download_button("📥 Export as Parquet", data=lambda: store.parquet_bytes(**filters),
+                                     file_name="ascendra_comparisons.parquet", mime="application/octet-stream",
+                                     on_click="ignore")
+
+        comparison_history()
+
+        # 📊 Admin-only view of where time and tokens went in this session
+        if username in st.secrets.get("ADMIN_USERS", ["ascendra"]):
+            with st.sidebar.expander("📊 Pipeline metrics"):
+                summary = metrics.summary()
+                if summary.empty:
+                    st.caption("No stages recorded yet.")
+                else:
+                    st.dataframe(summary)
+                    st.caption("Slowest recent stages")
+                    recent = metrics.to_frame().sort_values("seconds", ascending=False).head(10)
+                    st.dataframe(recent[[c for c in ["stage", "seconds", "source", "pair", "bytes", "cache_hit"] if c in recent]],
+                                 hide_index=True)
+                    st.caption(f"Appended to `{metrics.path}`")
+
         # ✅ These lines should align with the outermost block
 
         elif auth_status is False:
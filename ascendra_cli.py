@@ -0,0 +1,266 @@
+"""Headless framework-to-framework mapping.
+
+Runs the same parsing, prompt and score extraction as the Streamlit app, for
+selected or all level pairs, and writes each result as soon as it completes:
+
+    python ascendra_cli.py "ACQF Level Descriptors.csv" "EQF Level Descriptors.csv" \\
+        --concurrency 8 --output acqf_eqf.jsonl
+
+With --batch the comparisons are sent as one Batch API job instead (see
+batch_jobs), for bulk mappings that can wait for a cheaper answer.
+
+The API key is read from OPENAI_API_KEY. Use --base-url to point at another
+OpenAI-compatible endpoint, such as the local stand-in server in llm_standin.py.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from batch_jobs import (
+    DEFAULT_POLL_INTERVAL, ingest_batch, load_manifest, prepare_batch, save_manifest, submit_batch, wait_for_batch,
+    write_batch_input,
+)
+from comparison_store import DEFAULT_DB_PATH, ComparisonStore
+from consensus import MAX_SAMPLES
+from crosswalk import DEFAULT_CONCURRENCY, all_pairs, run_crosswalk
+from ingest import NoDescriptorsError, load_framework
+from llm_backend import DEFAULT_BASE_URL, DEFAULT_MODEL, get_backend, is_openai_api
+from outcome_extraction import extract_artefact
+from result_cache import DEFAULT_CACHE_DIR, ResultCache
+from similarity import shortlist_pairs, similarity_matrix
+
+CSV_FIELDS = [
+    "Primary Level", "Secondary Level", "Similarity Score", "Recommended Level", "Response", "Timestamp", "Cached",
+    "Model", "Prompt Version", "Prompt Tokens", "Cached Tokens", "Completion Tokens", "Score Spread",
+    "Level Agreement", "Error",
+]
+
+
+def load_file(path, client=None, cache=None, concurrency=DEFAULT_CONCURRENCY, model_extraction=False):
+    # Level descriptors are parsed and other PDFs' outcome statements found by pattern rules; the model
+    # extracts the learning outcomes of PDFs the rules cannot read (or of any non-descriptor PDF, if asked)
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        framework = load_framework(data, os.path.basename(path))
+        if framework.extraction != "rules" or not model_extraction:
+            return framework
+    except NoDescriptorsError:
+        if client is None:
+            raise
+    print(f"{os.path.basename(path)} holds no level descriptors; extracting its learning outcomes…", file=sys.stderr)
+    framework, stats = extract_artefact(data, os.path.basename(path), client, cache=cache, max_workers=concurrency)
+    print(f"Extracted from {stats['pages']} pages in {stats['chunks']} parts ({stats['cached_chunks']} from cache)",
+          file=sys.stderr)
+    return framework
+
+
+def batch_rows(args, client, cache, Primary_levels, Secondary_levels, pairs):
+    """Result rows of a Batch API job: cached pairs at once, the rest when the batch has finished.
+
+    The job's state is kept next to the output until its results are in, so
+    running the same command again after an interruption waits for the
+    submitted batch instead of submitting a new one.
+    """
+    manifest_path = args.batch_file or f"{args.output}.batch.json"
+    if os.path.exists(manifest_path):
+        manifest = load_manifest(manifest_path)
+        print(f"Resuming batch {manifest['batch_id']} ({len(manifest['requests'])} requests) from {manifest_path}",
+              file=sys.stderr)
+    else:
+        rows, requests, manifest = prepare_batch(client, Primary_levels, Secondary_levels, pairs,
+                                                 structured=not args.free_text, taxonomies=args.taxonomy, cache=cache)
+        yield from rows
+        if not requests:
+            return
+        input_path = f"{os.path.splitext(manifest_path)[0]}.input.jsonl"
+        write_batch_input(input_path, requests)
+        try:
+            batch = submit_batch(client, input_path, manifest,
+                                 description=f"{os.path.basename(args.primary)} → {os.path.basename(args.secondary)}")
+        finally:
+            # Uploaded, or to be written again by the next run: either way no longer needed here
+            os.remove(input_path)
+        save_manifest(manifest_path, manifest)
+        print(f"Submitted batch {batch.id} with {len(requests)} requests ({len(rows)} pairs answered from the cache); "
+              f"job state in {manifest_path}. Interrupt at any time and rerun to keep waiting.", file=sys.stderr)
+
+    def show_status(batch):
+        counts = batch.request_counts
+        progress = f" ({counts.completed} / {counts.total} done)" if counts and counts.total else ""
+        print(f"Batch {batch.id}: {batch.status}{progress}", file=sys.stderr)
+
+    batch = wait_for_batch(client, manifest["batch_id"], poll_interval=args.poll_interval, on_status=show_status)
+    yield from ingest_batch(client, batch, manifest, cache=cache)
+    os.remove(manifest_path)
+
+
+def parse_pair(value):
+    try:
+        primary, secondary = value.split(":", 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected PRIMARY:SECONDARY, got {value!r}")
+    return primary.strip(), secondary.strip()
+
+
+def parse_weights(value):
+    # "Knowledge=2,Skills=1" → {"Knowledge": 2.0, "Skills": 1.0}
+    weights = {}
+    for item in value.split(","):
+        try:
+            domain, weight = item.split("=", 1)
+            weights[domain.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected DOMAIN=WEIGHT[,DOMAIN=WEIGHT...], got {value!r}")
+    return weights
+
+
+def select_pairs(args, Primary_levels, Secondary_levels):
+    if args.pair:
+        unknown = [f"{p}:{s}" for p, s in args.pair if p not in Primary_levels or s not in Secondary_levels]
+        if unknown:
+            raise SystemExit(f"Unknown level pair(s): {unknown}. "
+                             f"Primary levels: {sorted(Primary_levels)}; Secondary levels: {sorted(Secondary_levels)}")
+        return args.pair
+    if args.top_k:
+        return shortlist_pairs(similarity_matrix(Primary_levels, Secondary_levels), args.top_k)
+    return all_pairs(Primary_levels, Secondary_levels)
+
+
+class ResultWriter:
+    """Append result rows to a JSONL or CSV file, flushing after every row."""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        write_header = self.is_csv and (not os.path.exists(path) or os.path.getsize(path) == 0)
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.is_csv:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Map levels of one qualifications framework onto another with GPT-4o.")
+    parser.add_argument("primary", help="Primary framework (CSV with Level/Domain/Descriptor columns, NQF-style PDF, "
+                                            "or any other PDF artefact to extract learning outcomes from)")
+    parser.add_argument("secondary", help="Secondary framework (CSV or PDF, as for primary)")
+    parser.add_argument("--pair", action="append", type=parse_pair, metavar="PRIMARY:SECONDARY",
+                        help='Compare only this level pair, e.g. "Level 6:Level 6". Repeatable. Default: all pairs.')
+    parser.add_argument("--top-k", type=int, default=0,
+                        help="Only compare the k locally most similar Secondary levels per Primary level")
+    parser.add_argument("--taxonomy", action="append", default=[], help="Selected taxonomy (repeatable)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Model name (default {DEFAULT_MODEL})")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="OpenAI-compatible API endpoint")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Parallel GPT requests")
+    parser.add_argument("--rpm", type=int, help="Account requests per minute to stay within (0 = unlimited; default "
+                                                "ASCENDRA_LLM_RPM, else the tier-1 limit on the OpenAI API and none "
+                                                "on other endpoints)")
+    parser.add_argument("--tpm", type=int, help="Account tokens per minute to stay within (0 = unlimited; default as "
+                                                "for --rpm)")
+    parser.add_argument("--output", "-o", default="comparisons.jsonl", help="Output file (.jsonl or .csv), appended to")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Result cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, ignoring cached results")
+    parser.add_argument("--store", default=DEFAULT_DB_PATH, help="SQLite comparison history to record results in")
+    parser.add_argument("--no-store", action="store_true", help="Do not record results in the comparison history")
+    parser.add_argument("--free-text", action="store_true",
+                        help="Ask for a free-text answer and scrape the score from it instead of structured JSON")
+    parser.add_argument("--per-domain", action="store_true",
+                        help="Compare each domain with a separate prompt and combine the domain scores")
+    parser.add_argument("--domain-weights", type=parse_weights, metavar="DOMAIN=WEIGHT,...",
+                        help='Weights for --per-domain, e.g. "Knowledge=2,Skills=1,Autonomy and Responsibility=1"')
+    parser.add_argument("--samples", type=int, default=1, metavar="N",
+                        help=f"Score each pair by the consensus of N structured answers from one request "
+                             f"(median score, spread and level agreement; at most {MAX_SAMPLES})")
+    parser.add_argument("--no-early-stop", action="store_true",
+                        help="With --samples, always request all N answers, even when the first ones agree")
+    parser.add_argument("--batch", action="store_true",
+                        help="Send the comparisons as one Batch API job (discounted, outside the interactive rate "
+                             "limits; answers within 24h) and wait for its results")
+    parser.add_argument("--batch-file", metavar="PATH",
+                        help="Where to keep the batch job's state (default: OUTPUT.batch.json)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between batch status checks (default {DEFAULT_POLL_INTERVAL:.0f})")
+    parser.add_argument("--model-extraction", action="store_true",
+                        help="Have the model extract the learning outcomes of non-descriptor PDFs, "
+                             "even where pattern rules find outcome statements")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.batch and (args.per_domain or args.samples > 1):
+        parser.error("--batch sends one whole-level comparison per pair; it cannot be combined with "
+                     "--per-domain or --samples")
+
+    # Other endpoints (e.g. the stand-in) may not check the key, but the client needs one
+    api_key = os.environ.get("OPENAI_API_KEY") or (None if is_openai_api(args.base_url) else "standin")
+    client = get_backend(api_key=api_key, base_url=args.base_url, model=args.model,
+                         rpm=args.rpm, tpm=args.tpm)
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+
+    Primary_framework = load_file(args.primary, client, cache, args.concurrency, args.model_extraction)
+    Secondary_framework = load_file(args.secondary, client, cache, args.concurrency, args.model_extraction)
+    Primary_levels = Primary_framework.levels
+    Secondary_levels = Secondary_framework.levels
+    pairs = select_pairs(args, Primary_levels, Secondary_levels)
+
+    writer = ResultWriter(args.output)
+    store = None if args.no_store else ComparisonStore(args.store)
+
+    if args.batch:
+        rows = batch_rows(args, client, cache, Primary_levels, Secondary_levels, pairs)
+    else:
+        rows = run_crosswalk(
+            client, Primary_levels, Secondary_levels, pairs=pairs,
+            max_workers=args.concurrency, taxonomies=args.taxonomy, cache=cache,
+            structured=not args.free_text, per_domain=args.per_domain, domain_weights=args.domain_weights,
+            samples=args.samples, early_stop=not args.no_early_stop,
+        )
+
+    started = time.monotonic()
+    done = failures = 0
+    prompt_tokens = cached_tokens = 0
+    try:
+        for done, row in enumerate(rows, start=1):
+            writer.write(row)
+            if store is not None and "Error" not in row:
+                store.add(row, Primary_framework.digest, Secondary_framework.digest,
+                          primary_name=os.path.basename(args.primary), secondary_name=os.path.basename(args.secondary),
+                          session="cli")
+            failures += "Error" in row
+            prompt_tokens += row.get("Prompt Tokens", 0)
+            cached_tokens += row.get("Cached Tokens", 0)
+            status = row.get("Error") or f"score {row['Similarity Score']}{' (cached)' if row.get('Cached') else ''}"
+            if row.get("Sample Scores"):
+                status += f" from {len(row['Sample Scores'])} samples (spread {row['Score Spread']})"
+            print(f"[{done}/{len(pairs)}] {row['Primary Level']} → {row['Secondary Level']}: {status}", file=sys.stderr)
+    finally:
+        writer.close()
+
+    print(f"Wrote {done - failures} comparisons to {args.output} in {time.monotonic() - started:.1f}s"
+          f"{f' ({failures} failed)' if failures else ''}", file=sys.stderr)
+    if prompt_tokens:
+        print(f"Prompt cache: {cached_tokens:,} of {prompt_tokens:,} prompt tokens cached "
+              f"({cached_tokens / prompt_tokens:.0%})", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,12 @@
 
 import streamlit as st
-import csv
 import pandas as pd
 from collections import defaultdict
-from openai import OpenAI
-from datetime import datetime
-import re
-from fpdf import FPDF
-import textwrap
 import streamlit_authenticator as stauth
-from io import BytesIO
-import fitz  # PyMuPDF
+from nqf_parser import parse_nqf_pdf_format
 
 st.set_page_config(page_title="Learning Outcomes Levelling", layout="centered")
 
-# --- PDF Parsing Helper ---
-def parse_nqf_pdf_format(file):
-    def extract_text_from_pdf(file):
-        text = ""
-        with fitz.open(stream=file.read(), filetype="pdf") as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
-
-    def parse_structured_descriptors(text):
-        level_data = []
-        matches = re.split(r"(Level\s+\d+)", text)
-        for i in range(1, len(matches), 2):
-            level = matches[i].strip()
-            content = matches[i+1].strip()
-            domains = re.split(r"(?=Knowledge|Skills|Responsibility|Autonomy)", content, flags=re.IGNORECASE)
-            for domain_text in domains:
-                domain_match = re.match(r"(Knowledge|Skills|Responsibility|Autonomy)", domain_text, re.IGNORECASE)
-                if domain_match:
-                    domain = domain_match.group(0).capitalize()
-                    descriptor = domain_text[len(domain):].strip()
-                    level_data.append({
-                        "Level": level,
-                        "Domain": domain,
-                        "Descriptor": descriptor
-                    })
-        return level_data
-
-    try:
-        raw_text = extract_text_from_pdf(file)
-        parsed_data = parse_structured_descriptors(raw_text)
-
-        if not parsed_data:
-            return None, None
-
-        df = pd.DataFrame(parsed_data)
-        csv_buffer = BytesIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
-        return parsed_data, csv_buffer
-
-    except Exception as e:
-        st.error(f"❌ PDF parsing error: {e}")
-        return None, None
-
 # --- Auth Setup ---
 hashed_passwords = ['$2b$12$2Myv8E.J5lIbWN5aThrBDOeGthVRDw4e7j38g.fDTOmiy.VvKRCZa']
 
@@ -111,10 +59,10 @@ if login_result is not None:
             if ext == "csv":
                 df_primary = pd.read_csv(Primary_file)
             elif ext == "pdf":
-                data, csv_bytes = parse_nqf_pdf_format(Primary_file)
-                if data:
-                    df_primary = pd.read_csv(csv_bytes)
-                else:
+                try:
+                    df_primary = parse_nqf_pdf_format(Primary_file)
+                except RuntimeError as e:
+                    st.error(f"❌ PDF parsing error: {e}")
                     df_primary = pd.DataFrame()
             else:
                 df_primary = pd.DataFrame()
@@ -129,10 +77,10 @@ if login_result is not None:
             if ext == "csv":
                 df_secondary = pd.read_csv(Secondary_file)
             elif ext == "pdf":
-                data, csv_bytes = parse_nqf_pdf_format(Secondary_file)
-                if data:
-                    df_secondary = pd.read_csv(csv_bytes)
-                else:
+                try:
+                    df_secondary = parse_nqf_pdf_format(Secondary_file)
+                except RuntimeError as e:
+                    st.error(f"❌ PDF parsing error: {e}")
                     df_secondary = pd.DataFrame()
             else:
                 df_secondary = pd.DataFrame()
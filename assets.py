@@ -0,0 +1,25 @@
+"""Static images, downscaled and encoded once per process."""
+
+import base64
+import io
+from functools import lru_cache
+
+LOGO_PATH = "ascendra_v5.png"
+SIDEBAR_LOGO_WIDTH_PX = 400     # shown 200 px wide; twice that for high-DPI screens
+
+
+@lru_cache(maxsize=None)
+def logo_png(width):
+    """The logo scaled down to ``width`` pixels, as PNG bytes."""
+    from PIL import Image   # only needed the first time each size is built
+
+    with Image.open(LOGO_PATH) as img:
+        img.thumbnail((width, width))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def logo_data_uri(width=SIDEBAR_LOGO_WIDTH_PX):
+    return f"data:image/png;base64,{base64.b64encode(logo_png(width)).decode()}"
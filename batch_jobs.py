@@ -0,0 +1,176 @@
+"""Offline crosswalks through the provider's Batch API.
+
+Bulk mappings do not need answers within seconds. A batch job writes every
+level-pair prompt to a batch-input JSONL file, uploads it and creates a
+batch, which the provider answers within its completion window at a
+discount and outside the account's interactive rate limits. The job is then
+polled until it finishes and its output JSONL is turned into the usual
+result rows, scores parsed as for ``run_comparison``; every answer is also
+stored in the result cache, so later interactive comparisons of the same
+pairs cost nothing.
+
+Pairs already in the result cache are answered from it and left out of the
+batch. The job's state (batch id and what each request stands for) is kept
+in a small manifest file, so an interrupted run can pick the job up again.
+"""
+
+import json
+import os
+import time
+
+from comparison import format_descriptors, result_row, usage_counts
+from llm_backend import as_backend
+from prompts import (
+    PROMPT_VERSION, RESULT_SCHEMA, STATIC_PREFIX, STRUCTURED_PREFIX, build_comparison_prompt, build_messages,
+)
+from result_cache import make_cache_key
+from scoring import parse_structured_result
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+DEFAULT_POLL_INTERVAL = 30.0
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def _cache_key(backend, p, p_desc, s, s_desc, structured, taxonomies):
+    return make_cache_key(p, p_desc, s, s_desc, STRUCTURED_PREFIX if structured else STATIC_PREFIX,
+                          PROMPT_VERSION, backend.model, taxonomies)
+
+
+def _parse(text, structured):
+    if not structured:
+        return None
+    try:
+        return parse_structured_result(text)
+    except ValueError:
+        return None     # no repair round trip in a batch; the score is scraped from the text instead
+
+
+def prepare_batch(client, Primary_levels, Secondary_levels, pairs, structured=True, taxonomies=(), cache=None):
+    """Split ``pairs`` into cached result rows and batch requests.
+
+    Returns ``(rows, requests, manifest)``: a row for every pair answered
+    from the cache, a batch-input line (custom_id, method, url, body) for
+    every other pair, and the manifest mapping each custom_id back to its
+    pair and cache key.
+    """
+    backend = as_backend(client)
+    rows, requests, entries = [], [], {}
+    for p, s in pairs:
+        key = _cache_key(backend, p, Primary_levels[p], s, Secondary_levels[s], structured, taxonomies)
+        cached = cache.get(key) if cache is not None else None
+        if cached:
+            rows.append(result_row(p, s, cached["result_text"], _parse(cached["result_text"], structured),
+                                   backend.model, True, usage_counts(None)))
+            continue
+        custom_id = f"pair-{len(requests)}"
+        prompt = build_comparison_prompt(
+            p, format_descriptors(Primary_levels[p]), s, format_descriptors(Secondary_levels[s]),
+        )
+        body = {"model": backend.model, "messages": build_messages(prompt, structured=structured)}
+        if structured:
+            body["response_format"] = {"type": "json_schema", "json_schema": RESULT_SCHEMA}
+        requests.append({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body})
+        entries[custom_id] = {"primary_level": p, "secondary_level": s, "cache_key": key}
+    manifest = {"model": backend.model, "structured": structured, "requests": entries}
+    return rows, requests, manifest
+
+
+def write_batch_input(path, requests):
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+def submit_batch(client, input_path, manifest, description=""):
+    """Upload the batch-input file and create the batch; records its ids in ``manifest`` and returns it."""
+    # The raw client: batch jobs do not go through the interactive request scheduler
+    api = as_backend(client).client
+    with open(input_path, "rb") as f:
+        uploaded = api.files.create(file=f, purpose="batch")
+    options = {"metadata": {"description": description}} if description else {}
+    batch = api.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT,
+                               completion_window=COMPLETION_WINDOW, **options)
+    manifest.update(batch_id=batch.id, input_file_id=uploaded.id, submitted_at=time.time())
+    return batch
+
+
+def save_manifest(path, manifest):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def wait_for_batch(client, batch_id, poll_interval=DEFAULT_POLL_INTERVAL, timeout=None, on_status=None):
+    """Poll the batch until it reaches a terminal status and return it.
+
+    ``on_status(batch)`` is called after every poll. Raises ``TimeoutError``
+    if ``timeout`` seconds pass first; the job keeps running and can be
+    waited for again.
+    """
+    api = as_backend(client).client
+    started = time.monotonic()
+    while True:
+        batch = api.batches.retrieve(batch_id)
+        if on_status is not None:
+            on_status(batch)
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout:.0f}s")
+        time.sleep(poll_interval)
+
+
+def _read_file(api, file_id):
+    return api.files.content(file_id).text if file_id else ""
+
+
+def ingest_batch(client, batch, manifest, cache=None):
+    """Turn a finished batch's output (and error) JSONL into result rows, in custom_id order.
+
+    Answers are parsed like ``run_comparison``'s and cached under the same
+    keys. Requests the batch failed or never answered yield rows with an
+    ``Error`` entry.
+    """
+    api = as_backend(client).client
+    structured = manifest["structured"]
+    answers = {}
+    for line in (_read_file(api, batch.output_file_id) + "\n" + _read_file(api, batch.error_file_id)).splitlines():
+        if line.strip():
+            answer = json.loads(line)
+            answers[answer["custom_id"]] = answer
+
+    rows = []
+    for custom_id, entry in manifest["requests"].items():
+        p, s = entry["primary_level"], entry["secondary_level"]
+        answer = answers.get(custom_id)
+        response = (answer or {}).get("response") or {}
+        if not answer or answer.get("error") or response.get("status_code") != 200:
+            error = (answer or {}).get("error") or (response.get("body") or {}).get("error")
+            rows.append({"Primary Level": p, "Secondary Level": s, "Similarity Score": "N/A",
+                         "Error": (error or {}).get("message") or f"no answer in batch {batch.id} ({batch.status})"})
+            continue
+        body = response["body"]
+        usage = body.get("usage") or {}
+        result_text = body["choices"][0]["message"]["content"]
+        parsed = _parse(result_text, structured)
+        if result_text and cache is not None and (parsed or not structured):
+            cache.set(entry["cache_key"], {
+                "result_text": result_text,
+                "model": manifest["model"],
+                "prompt_version": PROMPT_VERSION,
+            })
+        row = result_row(p, s, result_text, parsed, manifest["model"], False, {
+            "Prompt Tokens": usage.get("prompt_tokens") or 0,
+            "Cached Tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+            "Completion Tokens": usage.get("completion_tokens") or 0,
+        })
+        row["Batch ID"] = batch.id
+        rows.append(row)
+    return rows
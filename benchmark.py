@@ -0,0 +1,292 @@
+"""Offline benchmark for parsing, grouping, prompt building and report rendering.
+
+Generates synthetic frameworks (N levels × M domains, descriptors of a given
+length) as CSV and as NQF-style PDFs laid out like the South African level
+descriptors, then times each pipeline stage with a stub LLM, so nothing
+touches the network. Run from the repository root:
+
+    python benchmark.py --sizes 10x3,10x10,30x10 --output bench.json
+    python benchmark.py --output bench-new.json --compare bench.json
+
+Results are written as JSON (one entry per stage and size, with min / median
+/ mean seconds) so runs from different versions can be compared; with
+``--compare`` the exit status is 1 if any stage got slower than the threshold.
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import textwrap
+import time
+import types
+from datetime import datetime
+
+import fitz  # PyMuPDF
+
+import ingest
+from comparison import format_descriptors, run_comparison
+from crosswalk import all_pairs
+from ingest import group_levels, load_framework
+from nqf_parser import LEVEL_WORDS, iter_nqf_records, iter_page_texts, parse_nqf_pdf_format
+from outcome_rules import iter_outcome_records
+from prompts import build_comparison_prompt, build_messages
+from report import build_batch_report, build_comparison_report
+
+DEFAULT_SIZES = "10x3,10x10,30x10"
+DEFAULT_REPEATS = 5
+MAX_BATCH_ROWS = 25     # keep the batch report to a realistic session size
+
+VOCABULARY = (
+    "demonstrate understanding knowledge field discipline practice apply methods procedures techniques "
+    "evaluate complex problems context responsibility autonomy learning information sources analyse "
+    "synthesise communicate ethical professional systems theories concepts principles judgement "
+    "supervised environment well-defined unfamiliar abstract specialised accountability initiative"
+).split()
+NQF_DOMAINS = [
+    "Scope of knowledge", "Knowledge literacy", "Method and procedure", "Problem solving", "Ethics and professional practice",
+    "Accessing, processing and managing information", "Producing and communicating information",
+    "Context and systems", "Management of learning", "Accountability",
+]
+NUMBER_WORDS = {v: k.title() for k, v in LEVEL_WORDS.items()}
+
+
+# --- Synthetic frameworks -------------------------------------------------
+
+def synthetic_records(levels, domains, words, seed=0):
+    """(Level, Domain, Descriptor) rows; the same arguments always give the same rows."""
+    rng = random.Random(seed)
+    domain_names = [NQF_DOMAINS[i] if i < len(NQF_DOMAINS) else f"Domain {i + 1}" for i in range(domains)]
+    return [
+        (str(level), domain, "a learner is able to " + " ".join(rng.choice(VOCABULARY) for _ in range(words)) + ".")
+        for level in range(1, levels + 1)
+        for domain in domain_names
+    ]
+
+
+def records_to_csv(records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Level", "Domain", "Descriptor"])
+    writer.writerows(records)
+    return buffer.getvalue().encode("utf-8")
+
+
+def records_to_nqf_pdf(records, width=95, lines_per_page=52):
+    """Lay records out as "26. NQF Level Five" / "a. Domain, in respect of which ..." pages.
+
+    The NQF layout letters domains a–j, so at most ten domains per level are written.
+    """
+    lines = []
+    current_level = None
+    letter = 0
+    for level, domain, descriptor in records:
+        if level != current_level:
+            current_level, letter = level, 0
+            lines.append(f"{21 + int(level)}.\tNQF Level {NUMBER_WORDS.get(level, level)}")
+        if letter >= 10:
+            continue
+        text = f"{'abcdefghij'[letter]}.\t {domain}, in respect of which {descriptor}"
+        lines.extend(textwrap.wrap(text, width))
+        letter += 1
+
+    doc = fitz.open()
+    for start in range(0, len(lines), lines_per_page):
+        page = doc.new_page()
+        for i, line in enumerate(lines[start:start + lines_per_page]):
+            page.insert_text((50, 60 + i * 13), line.replace("\t", " "), fontsize=9)
+        page.insert_text((300, 810), str(start // lines_per_page + 1), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+# --- Stub LLM -------------------------------------------------------------
+
+class StubCompletions:
+    """Answers instantly with a canned comparison whose score depends on the prompt."""
+
+    def create(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        score = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % 101
+        narrative = "The two levels are broadly comparable in knowledge, skills and autonomy. " * 20
+        if "response_format" in kwargs:
+            content = json.dumps({
+                "similarity_score": score,
+                "recommended_secondary_level": "Level 1",
+                "domain_scores": [{"domain": d, "score": score} for d in ("Knowledge", "Skills", "Autonomy and Responsibility")],
+                "narrative": narrative,
+            })
+        else:
+            content = f"{narrative}\n\nSimilarity score: {score}/100\n\n" + "●" * (score // 10) + "○" * (10 - score // 10)
+        usage = types.SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4,
+                                      prompt_tokens_details=None)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+                                     usage=usage)
+
+
+def stub_client():
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=StubCompletions()))
+
+
+# --- Timing ---------------------------------------------------------------
+
+def time_call(fn, repeats, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {
+        "repeats": repeats,
+        "min_s": round(min(timings), 6),
+        "median_s": round(statistics.median(timings), 6),
+        "mean_s": round(statistics.fmean(timings), 6),
+    }
+
+
+def fresh_load(data, filename):
+    # Bypass the per-digest framework cache so every repeat really parses
+    ingest._frameworks.clear()
+    return load_framework(data, filename)
+
+
+def bench_size(levels, domains, words, repeats, seed=0):
+    size = f"{levels}x{domains}"
+    records = synthetic_records(levels, domains, words, seed)
+    csv_bytes = records_to_csv(records)
+    pdf_bytes = records_to_nqf_pdf(records)
+    expected = levels * min(domains, len(NQF_DOMAINS))
+    parsed = len(fresh_load(pdf_bytes, "bench.pdf").records)
+    if parsed != expected:
+        # Otherwise the PDF timings would be measuring a parser that silently drops descriptors
+        raise RuntimeError(f"Synthetic {size} PDF parsed into {parsed} descriptors, expected {expected}")
+    pages = list(iter_page_texts(pdf_bytes))
+    Primary_levels = fresh_load(csv_bytes, "bench.csv").levels
+    Secondary_levels = group_levels(synthetic_records(levels, domains, words, seed + 1))
+    pairs = all_pairs(Primary_levels, Secondary_levels)
+    client = stub_client()
+
+    def prompts():
+        for p, s in pairs:
+            build_messages(build_comparison_prompt(
+                p, format_descriptors(Primary_levels[p]), s, format_descriptors(Secondary_levels[s]),
+            ), structured=True)
+
+    def comparisons():
+        return [run_comparison(client, p, Primary_levels[p], s, Secondary_levels[s], structured=True) for p, s in pairs]
+
+    rows = comparisons()[:MAX_BATCH_ROWS]
+    p, s = pairs[0]
+    cases = [
+        ("csv_ingest", lambda: fresh_load(csv_bytes, "bench.csv"), {"bytes": len(csv_bytes)}),
+        ("pdf_ingest", lambda: fresh_load(pdf_bytes, "bench.pdf"), {"bytes": len(pdf_bytes)}),
+        ("parse_nqf_pdf_format", lambda: parse_nqf_pdf_format(pdf_bytes), {"bytes": len(pdf_bytes)}),
+        ("pdf_records", lambda: list(iter_nqf_records(pdf_bytes)), {"bytes": len(pdf_bytes)}),
+        ("outcome_rules", lambda: list(iter_outcome_records(pages, size, max_domain_chars=math.inf)),
+         {"pages": len(pages)}),
+        ("grouping", lambda: group_levels(records), {"records": len(records)}),
+        ("prompt_building", prompts, {"pairs": len(pairs)}),
+        ("stub_comparisons", comparisons, {"pairs": len(pairs)}),
+        ("report_single", lambda: build_comparison_report(
+            p, Primary_levels[p], s, Secondary_levels[s], rows[0]["Response"], score=rows[0]["Similarity Score"],
+        ), {}),
+        ("report_batch", lambda: build_batch_report(rows, Primary_levels, Secondary_levels), {"comparisons": len(rows)}),
+    ]
+
+    results = []
+    for case, fn, extra in cases:
+        result = {"case": case, "size": size, "levels": levels, "domains": domains, "words": words, **extra}
+        result.update(time_call(fn, repeats))
+        print(f"{size:>8}  {case:<22} median {result['median_s'] * 1000:9.2f} ms", file=sys.stderr)
+        results.append(result)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pymupdf": fitz.VersionBind,
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Print median-time ratios against a previous run; return the number of regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["size"], r["words"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        old = baseline.get((result["case"], result["size"], result["words"]))
+        if not old or not old["median_s"]:
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  ⚠️ slower"
+        print(f"{result['size']:>8}  {result['case']:<22} {ratio:6.2f}×{flag}")
+    return regressions
+
+
+def parse_size(value):
+    try:
+        levels, domains = (int(n) for n in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected LEVELSxDOMAINS, got {value!r}")
+    return levels, domains
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Time Ascendra's parsing, grouping, prompt and report stages offline.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"Comma-separated LEVELSxDOMAINS framework sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--words", type=int, default=40, help="Words per descriptor")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Timed repeats per stage")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic descriptors")
+    parser.add_argument("--output", "-o", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", metavar="BASELINE", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Median-time ratio above which a stage counts as a regression")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.compare and not os.path.exists(args.compare):
+        parser.error(f"baseline {args.compare} does not exist")
+    sizes = [parse_size(value) for value in args.sizes.split(",") if value.strip()]
+
+    results = []
+    for levels, domains in sizes:
+        results.extend(bench_size(levels, domains, args.words, args.repeats, args.seed))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Single level-pair comparison shared by the UI and the crosswalk runner."""
+
+from collections.abc import Mapping
+from datetime import datetime
+
+from llm_backend import as_backend
+from metrics import record_stage, usage_fields
+from prompts import (
+    PROMPT_VERSION, RESULT_SCHEMA, STATIC_PREFIX, STRUCTURED_PREFIX,
+    build_comparison_prompt, build_messages, build_repair_message,
+)
+from result_cache import make_cache_key
+from scoring import extract_score, parse_structured_result
+
+
+def format_descriptors(descriptors):
+    # {Domain → Descriptor} → "Domain: Descriptor" lines
+    if isinstance(descriptors, Mapping):
+        return "\n".join(f"{domain}: {desc}" for domain, desc in descriptors.items())
+    return str(descriptors)
+
+
+def usage_counts(usage):
+    """Prompt, cached prompt and completion token counts from an API ``usage`` object."""
+    if usage is None:
+        return {"Prompt Tokens": 0, "Cached Tokens": 0, "Completion Tokens": 0}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "Prompt Tokens": usage.prompt_tokens or 0,
+        "Cached Tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        "Completion Tokens": usage.completion_tokens or 0,
+    }
+
+
+def _add_usage(total, usage):
+    return {key: total[key] + usage[key] for key in total}
+
+
+def call_gpt(backend, prompt):
+    """Return the completion text and its token usage counts."""
+    response = backend.create(build_messages(prompt))
+    return response.choices[0].message.content, usage_counts(getattr(response, "usage", None))
+
+
+def call_gpt_structured(backend, prompt, system=None, schema=RESULT_SCHEMA, parse=parse_structured_result, **options):
+    """Request a JSON answer matching RESULT_SCHEMA and validate it.
+
+    An answer that fails validation is sent back once with the validation
+    error for the model to repair. Returns ``(parsed, text, usage)`` where
+    ``parsed`` is None if the repaired answer is still invalid; ``usage``
+    covers both calls. Other prompts (e.g. per-domain ones) pass their own
+    system prompt, schema and parser; ``options`` (e.g. ``max_tokens``) go
+    to the API call.
+    """
+    messages = build_messages(prompt, structured=True, system=system)
+    response_format = {"type": "json_schema", "json_schema": schema}
+    usage = usage_counts(None)
+    for attempt in range(2):
+        response = backend.create(messages, response_format=response_format, **options)
+        text = response.choices[0].message.content
+        usage = _add_usage(usage, usage_counts(getattr(response, "usage", None)))
+        try:
+            return parse(text), text, usage
+        except ValueError as e:
+            messages = messages + [{"role": "assistant", "content": text or ""}, build_repair_message(e)]
+    return None, text, usage
+
+
+def stream_gpt(backend, prompt, usage=None):
+    """Yield the completion text chunk by chunk as the model produces it.
+
+    Token usage arrives with the final chunk; if a ``usage`` dict is passed
+    it is filled in once the stream ends.
+    """
+    # Retries only apply to opening the stream; once tokens flow they are not replayed
+    stream = backend.create(build_messages(prompt), stream=True, stream_options={"include_usage": True})
+    for chunk in stream:
+        if getattr(chunk, "usage", None) is not None and usage is not None:
+            usage.update(usage_counts(chunk.usage))
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def run_comparison(client, primary_level, primary_descriptors, secondary_level, secondary_descriptors,
+                   taxonomies=(), cache=None, stream_to=None, structured=False, metrics=None):
+    """Compare one Primary level with one Secondary level.
+
+    Returns a result row in the same shape as ``st.session_state.results``
+    plus a ``Cached`` flag telling whether the answer came from the cache and
+    the prompt / cached prompt / completion token counts of the call (zero
+    for cached answers).
+
+    With ``structured=True`` the model answers in JSON (see RESULT_SCHEMA):
+    the row's ``Response`` is the narrative, and ``Recommended Level`` and
+    ``Domain Scores`` are filled in. If the answer cannot be validated even
+    after the repair request, the score falls back to scraping the text.
+
+    When ``stream_to`` is given (e.g. ``st.write_stream``) a fresh free-text
+    answer is requested with ``stream=True`` and the token generator is
+    handed to it; it must consume the generator and return the full text.
+    Cached and structured answers are returned without calling it.
+
+    The model call (or cache lookup) and score parsing are timed on the
+    ``metrics`` recorder, if given. ``client`` is an ``LLMBackend`` or a bare
+    OpenAI-style client, which is used with the default backend settings.
+    """
+    backend = as_backend(client)
+    cache_key = make_cache_key(
+        primary_level, primary_descriptors, secondary_level, secondary_descriptors,
+        STRUCTURED_PREFIX if structured else STATIC_PREFIX, PROMPT_VERSION, backend.model, taxonomies,
+    )
+    pair = f"{primary_level} → {secondary_level}"
+
+    usage = usage_counts(None)
+    parsed = None
+    with record_stage(metrics, "gpt_call", pair=pair, structured=structured) as stage:
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached:
+            result_text = cached["result_text"]
+        else:
+            prompt = build_comparison_prompt(
+                primary_level, format_descriptors(primary_descriptors),
+                secondary_level, format_descriptors(secondary_descriptors),
+            )
+            if structured:
+                parsed, result_text, usage = call_gpt_structured(backend, prompt)
+            elif stream_to is not None:
+                result_text = stream_to(stream_gpt(backend, prompt, usage=usage))
+            else:
+                result_text, usage = call_gpt(backend, prompt)
+            # Structured answers that failed validation are not cached, so the next run asks again
+            if result_text and cache is not None and (parsed or not structured):
+                cache.set(cache_key, {
+                    "result_text": result_text,
+                    "model": backend.model,
+                    "prompt_version": PROMPT_VERSION,
+                })
+        stage.update(cache_hit=bool(cached), **usage_fields(usage))
+
+    with record_stage(metrics, "score_parsing", pair=pair, bytes=len(result_text or "")):
+        if cached and structured:
+            parsed = parse_structured_result(result_text)
+        return result_row(primary_level, secondary_level, result_text, parsed, backend.model, bool(cached), usage)
+
+
+def result_row(primary_level, secondary_level, result_text, parsed, model, cached, usage):
+    """The result row for an answer: from its validated JSON (``parsed``) if any, else scraped from the text."""
+    if parsed:
+        ai_score = parsed["similarity_score"]
+        response_text = parsed["narrative"]
+    else:
+        ai_score = extract_score(result_text)
+        response_text = result_text
+    return {
+        "Primary Level": primary_level,
+        "Secondary Level": secondary_level,
+        "Similarity Score": ai_score if ai_score is not None else "N/A",
+        "Recommended Level": parsed["recommended_secondary_level"] if parsed else "",
+        "Domain Scores": parsed["domain_scores"] if parsed else {},
+        "Response": response_text,
+        "Timestamp": datetime.utcnow().isoformat(),
+        "Cached": cached,
+        "Model": model,
+        "Prompt Version": PROMPT_VERSION,
+        **usage,
+    }
@@ -0,0 +1,289 @@
+"""Durable SQLite store of comparison results.
+
+Every comparison is kept with the frameworks it came from (by content
+digest, tagged ":rules" or ":model" for outcomes not parsed as descriptors;
+see ingest.framework_digest), the level pair, model and prompt version, so historic results can be
+looked up, searched and exported without calling the model again:
+
+- ``lookup`` finds the latest result for a framework pair and level pair (indexed)
+- ``search`` runs full-text queries over responses (FTS5)
+- ``history`` pages through results, newest first
+- ``export_csv`` / ``export_parquet`` stream rows out in batches
+
+The store can also be queried from the command line:
+
+    python comparison_store.py search "autonomy AND supervision"
+    python comparison_store.py export all_comparisons.parquet
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+DEFAULT_DB_PATH = os.environ.get("ASCENDRA_DB_PATH", "ascendra_comparisons.db")
+EXPORT_BATCH_SIZE = 500
+
+COLUMNS = [
+    "id", "created_at", "session", "primary_framework", "primary_name", "secondary_framework", "secondary_name",
+    "primary_level", "secondary_level", "model", "prompt_version", "score", "recommended_level", "domain_scores",
+    "response", "cached", "prompt_tokens", "cached_tokens", "completion_tokens",
+]
+FILTERS = ["session", "primary_framework", "secondary_framework", "primary_level", "secondary_level",
+           "model", "prompt_version"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comparisons (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    session TEXT,
+    primary_framework TEXT NOT NULL,
+    primary_name TEXT,
+    secondary_framework TEXT NOT NULL,
+    secondary_name TEXT,
+    primary_level TEXT NOT NULL,
+    secondary_level TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    score INTEGER,
+    recommended_level TEXT,
+    domain_scores TEXT,
+    response TEXT,
+    cached INTEGER,
+    prompt_tokens INTEGER,
+    cached_tokens INTEGER,
+    completion_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS comparisons_pair ON comparisons
+    (primary_framework, secondary_framework, primary_level, secondary_level, model, prompt_version);
+CREATE INDEX IF NOT EXISTS comparisons_session ON comparisons (session);
+CREATE VIRTUAL TABLE IF NOT EXISTS comparisons_fts USING fts5(
+    response, primary_level, secondary_level, content='comparisons', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS comparisons_ai AFTER INSERT ON comparisons BEGIN
+    INSERT INTO comparisons_fts (rowid, response, primary_level, secondary_level)
+    VALUES (new.id, new.response, new.primary_level, new.secondary_level);
+END;
+CREATE TRIGGER IF NOT EXISTS comparisons_ad AFTER DELETE ON comparisons BEGIN
+    INSERT INTO comparisons_fts (comparisons_fts, rowid, response, primary_level, secondary_level)
+    VALUES ('delete', old.id, old.response, old.primary_level, old.secondary_level);
+END;
+"""
+
+
+def _where(filters):
+    unknown = set(filters) - set(FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {sorted(unknown)}")
+    clauses = [(f"c.{name} = ?", value) for name, value in filters.items() if value is not None]
+    if not clauses:
+        return "", []
+    return " WHERE " + " AND ".join(sql for sql, _ in clauses), [value for _, value in clauses]
+
+
+def _quote_terms(query):
+    # Plain words, matched as literal tokens: "level-6" or "O*NET" would otherwise be FTS syntax errors
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class ComparisonStore:
+    """SQLite-backed comparison history; safe to share between sessions and threads."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation: sqlite3 connections cannot cross threads
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+
+    def add(self, row, primary_framework, secondary_framework, primary_name="", secondary_name="", session=None):
+        """Store one result row (as returned by ``run_comparison``) and return its id."""
+        score = row.get("Similarity Score")
+        values = {
+            "created_at": row.get("Timestamp") or datetime.utcnow().isoformat(),
+            "session": session,
+            "primary_framework": primary_framework,
+            "primary_name": primary_name,
+            "secondary_framework": secondary_framework,
+            "secondary_name": secondary_name,
+            "primary_level": str(row["Primary Level"]),
+            "secondary_level": str(row["Secondary Level"]),
+            "model": row.get("Model", ""),
+            "prompt_version": row.get("Prompt Version", ""),
+            "score": score if isinstance(score, int) else None,
+            "recommended_level": row.get("Recommended Level") or None,
+            "domain_scores": json.dumps(row["Domain Scores"]) if row.get("Domain Scores") else None,
+            "response": row.get("Response", ""),
+            "cached": int(bool(row.get("Cached"))),
+            "prompt_tokens": row.get("Prompt Tokens", 0),
+            "cached_tokens": row.get("Cached Tokens", 0),
+            "completion_tokens": row.get("Completion Tokens", 0),
+        }
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO comparisons ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+                list(values.values()),
+            )
+            return cursor.lastrowid
+
+    def lookup(self, primary_framework, secondary_framework, primary_level, secondary_level,
+               model=None, prompt_version=None):
+        """Latest stored result for this framework pair and level pair, or None."""
+        where, params = _where({
+            "primary_framework": primary_framework, "secondary_framework": secondary_framework,
+            "primary_level": primary_level, "secondary_level": secondary_level,
+            "model": model, "prompt_version": prompt_version,
+        })
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT * FROM comparisons c{where} ORDER BY c.id DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def count(self, **filters):
+        where, params = _where(filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM comparisons c{where}", params).fetchone()[0]
+
+    def history(self, page=1, page_size=50, **filters):
+        """One page of results, newest first, and the total number of matching results."""
+        where, params = _where(filters)
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM comparisons c{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM comparisons c{where} ORDER BY c.id DESC LIMIT ? OFFSET ?",
+                params + [page_size, (max(page, 1) - 1) * page_size],
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def search(self, query, limit=50, offset=0, **filters):
+        """Full-text search over responses and level names, best matches first.
+
+        Accepts FTS5 query syntax (``autonomy AND supervision``, ``"problem solving"``);
+        anything that is not valid syntax is searched as plain words.
+        """
+        where, params = _where(filters)
+        sql = (
+            "SELECT c.*, snippet(comparisons_fts, 0, '[', ']', '…', 12) AS snippet "
+            "FROM comparisons_fts JOIN comparisons c ON c.id = comparisons_fts.rowid "
+            f"WHERE comparisons_fts MATCH ?{where.replace(' WHERE ', ' AND ')} "
+            "ORDER BY bm25(comparisons_fts) LIMIT ? OFFSET ?"
+        )
+        with self._connect() as conn:
+            try:
+                rows = conn.execute(sql, [query] + params + [limit, offset]).fetchall()
+            except sqlite3.OperationalError:
+                rows = conn.execute(sql, [_quote_terms(query)] + params + [limit, offset]).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_rows(self, batch_size=EXPORT_BATCH_SIZE, **filters):
+        """Yield lists of up to ``batch_size`` rows (as tuples in COLUMNS order), oldest first."""
+        where, params = _where(filters)
+        with self._connect() as conn:
+            cursor = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM comparisons c{where} ORDER BY c.id", params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield [tuple(row) for row in batch]
+
+    def export_csv(self, file, **filters):
+        """Write matching rows to a text file object batch by batch; return the row count."""
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        count = 0
+        for batch in self.iter_rows(**filters):
+            writer.writerows(batch)
+            count += len(batch)
+        return count
+
+    def export_parquet(self, file, **filters):
+        """Write matching rows to a Parquet file (path or binary file object); return the row count."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+        schema = pa.schema([
+            (name, pa.int64() if name in ("id", "score", "cached", "prompt_tokens", "cached_tokens",
+                                          "completion_tokens") else pa.string())
+            for name in COLUMNS
+        ])
+        count = 0
+        with pq.ParquetWriter(file, schema) as writer:
+            for batch in self.iter_rows(**filters):
+                writer.write_batch(pa.RecordBatch.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(zip(*batch), schema)], schema=schema,
+                ))
+                count += len(batch)
+            if not count:
+                writer.write_table(schema.empty_table())
+        return count
+
+    def csv_bytes(self, **filters):
+        buffer = io.StringIO()
+        self.export_csv(buffer, **filters)
+        return buffer.getvalue().encode("utf-8")
+
+    def parquet_bytes(self, **filters):
+        buffer = io.BytesIO()
+        self.export_parquet(buffer, **filters)
+        return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export stored comparisons.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="Full-text search over responses")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    history = commands.add_parser("history", help="List stored comparisons, newest first")
+    history.add_argument("--page", type=int, default=1)
+    history.add_argument("--page-size", type=int, default=20)
+    export = commands.add_parser("export", help="Export comparisons to .csv or .parquet")
+    export.add_argument("output")
+    for command in (search, history, export):
+        command.add_argument("--primary-framework", help="Only this Primary framework (its digest)")
+        command.add_argument("--secondary-framework", help="Only this Secondary framework (its digest)")
+        command.add_argument("--model")
+    args = parser.parse_args(argv)
+
+    store = ComparisonStore(args.db)
+    filters = {"primary_framework": args.primary_framework, "secondary_framework": args.secondary_framework,
+               "model": args.model}
+
+    if args.command == "search":
+        for row in store.search(args.query, limit=args.limit, **filters):
+            print(f"#{row['id']} {row['created_at'][:16]} {row['primary_level']} → {row['secondary_level']} "
+                  f"(score {row['score']}): {row['snippet']}")
+    elif args.command == "history":
+        rows, total = store.history(page=args.page, page_size=args.page_size, **filters)
+        for row in rows:
+            print(f"#{row['id']} {row['created_at'][:16]} {row['primary_name']} {row['primary_level']} → "
+                  f"{row['secondary_name']} {row['secondary_level']}: score {row['score']}")
+        print(f"Page {args.page} of {max(1, -(-total // args.page_size))} ({total} comparisons)", file=sys.stderr)
+    elif args.output.lower().endswith(".parquet"):
+        print(f"Exported {store.export_parquet(args.output, **filters)} comparisons to {args.output}", file=sys.stderr)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            count = store.export_csv(f, **filters)
+        print(f"Exported {count} comparisons to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
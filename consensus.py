@@ -0,0 +1,146 @@
+"""Self-consistency scoring: several answers to one comparison, combined.
+
+One similarity score is noisy. Consensus mode asks for ``samples`` structured
+answers in a single request (the chat completions ``n`` parameter), so the
+prompt is sent and billed once, and reports their median score, the spread
+between the lowest and highest score and the share of answers that agree on
+the recommended level. With early stopping a first request asks for only
+FIRST_SAMPLES answers; the rest are requested only if those disagree.
+"""
+
+import statistics
+from collections import Counter
+from datetime import datetime
+
+from comparison import _add_usage, format_descriptors, usage_counts
+from llm_backend import as_backend
+from metrics import record_stage, usage_fields
+from prompts import PROMPT_VERSION, RESULT_SCHEMA, STRUCTURED_PREFIX, build_comparison_prompt, build_messages
+from result_cache import make_cache_key
+from scoring import parse_structured_result
+
+DEFAULT_SAMPLES = 5
+MAX_SAMPLES = 10
+FIRST_SAMPLES = 2
+AGREEMENT_SPREAD = 10       # scores at most this far apart agree
+CONSENSUS_PROMPT_VERSION = f"{PROMPT_VERSION}-consensus"
+
+
+def request_samples(backend, prompt, n):
+    """One request for ``n`` structured answers; returns ``(texts, usage)``."""
+    response = backend.create(build_messages(prompt, structured=True),
+                              response_format={"type": "json_schema", "json_schema": RESULT_SCHEMA}, n=n)
+    texts = [choice.message.content for choice in response.choices]
+    return texts, usage_counts(getattr(response, "usage", None))
+
+
+def parse_samples(texts):
+    """The answers among ``texts`` that pass validation, parsed; invalid ones are dropped, not repaired."""
+    parsed = []
+    for text in texts:
+        try:
+            parsed.append(parse_structured_result(text))
+        except ValueError:
+            pass
+    return parsed
+
+
+def _level_key(level):
+    return " ".join(str(level).lower().split())
+
+
+def samples_agree(samples, spread=AGREEMENT_SPREAD):
+    """True if the scores lie within ``spread`` of each other and every answer recommends the same level."""
+    scores = [sample["similarity_score"] for sample in samples]
+    levels = {_level_key(sample["recommended_secondary_level"]) for sample in samples}
+    return bool(samples) and max(scores) - min(scores) <= spread and len(levels) == 1
+
+
+def combine_samples(samples):
+    """Median score, spread, recommended level and agreement, per-domain medians and a representative narrative."""
+    scores = [sample["similarity_score"] for sample in samples]
+    median = round(statistics.median(scores))
+    votes = Counter(_level_key(sample["recommended_secondary_level"]) for sample in samples)
+    level_key, level_votes = votes.most_common(1)[0]
+    domain_scores = {}
+    for sample in samples:
+        for domain, score in sample["domain_scores"].items():
+            domain_scores.setdefault(domain, []).append(score)
+    # The narrative of the answer closest to the median, so the text matches the reported score
+    representative = min(samples, key=lambda sample: abs(sample["similarity_score"] - median))
+    return {
+        "score": median,
+        "spread": max(scores) - min(scores),
+        "recommended_level": next(sample["recommended_secondary_level"] for sample in samples
+                                  if _level_key(sample["recommended_secondary_level"]) == level_key),
+        "agreement": level_votes / len(samples),
+        "domain_scores": {domain: round(statistics.median(values)) for domain, values in domain_scores.items()},
+        "narrative": representative["narrative"],
+        "scores": scores,
+    }
+
+
+def run_consensus(client, primary_level, primary_descriptors, secondary_level, secondary_descriptors,
+                  samples=DEFAULT_SAMPLES, early_stop=True, taxonomies=(), cache=None, metrics=None):
+    """Compare two levels by the consensus of ``samples`` structured answers.
+
+    Returns a row in the same shape as ``run_comparison`` with the median as
+    ``Similarity Score`` and the majority ``Recommended Level``, plus
+    ``Sample Scores``, ``Score Spread`` (highest minus lowest) and ``Level
+    Agreement`` (share of answers recommending that level). With
+    ``early_stop`` only FIRST_SAMPLES answers are requested first and the
+    rest only if those disagree. Answers that fail validation are left out;
+    if none pass, the score is "N/A".
+    """
+    backend = as_backend(client)
+    samples = max(1, min(samples, MAX_SAMPLES))
+    first = min(FIRST_SAMPLES, samples) if early_stop else samples
+    cache_key = make_cache_key(
+        primary_level, primary_descriptors, secondary_level, secondary_descriptors, STRUCTURED_PREFIX,
+        f"{CONSENSUS_PROMPT_VERSION}-{samples}{'-early' if early_stop else ''}", backend.model, taxonomies,
+    )
+    pair = f"{primary_level} → {secondary_level}"
+
+    usage = usage_counts(None)
+    with record_stage(metrics, "gpt_call", pair=pair, structured=True, samples=samples) as stage:
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached:
+            texts = cached["samples"]
+            parsed = parse_samples(texts)
+        else:
+            prompt = build_comparison_prompt(
+                primary_level, format_descriptors(primary_descriptors),
+                secondary_level, format_descriptors(secondary_descriptors),
+            )
+            texts, usage = request_samples(backend, prompt, first)
+            parsed = parse_samples(texts)
+            if first < samples and not samples_agree(parsed):
+                more, more_usage = request_samples(backend, prompt, samples - first)
+                texts, usage = texts + more, _add_usage(usage, more_usage)
+                parsed = parse_samples(texts)
+            if parsed and cache is not None:
+                cache.set(cache_key, {
+                    "result_text": texts[0],
+                    "samples": texts,
+                    "model": backend.model,
+                    "prompt_version": CONSENSUS_PROMPT_VERSION,
+                })
+        stage.update(cache_hit=bool(cached), requested=len(texts), valid=len(parsed), **usage_fields(usage))
+
+    combined = combine_samples(parsed) if parsed else None
+    return {
+        "Primary Level": primary_level,
+        "Secondary Level": secondary_level,
+        "Similarity Score": combined["score"] if combined else "N/A",
+        "Recommended Level": combined["recommended_level"] if combined else "",
+        "Domain Scores": combined["domain_scores"] if combined else {},
+        "Response": combined["narrative"] if combined else (texts[0] if texts else ""),
+        "Sample Scores": combined["scores"] if combined else [],
+        "Score Spread": combined["spread"] if combined else None,
+        "Level Agreement": combined["agreement"] if combined else None,
+        "Timestamp": datetime.utcnow().isoformat(),
+        "Cached": bool(cached),
+        "Model": backend.model,
+        "Prompt Version": CONSENSUS_PROMPT_VERSION,
+        **usage,
+    }
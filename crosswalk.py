@@ -0,0 +1,74 @@
+"""Full Primary × Secondary crosswalk with bounded concurrent GPT calls."""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from comparison import run_comparison
+from consensus import run_consensus
+from domain_comparison import run_domain_comparison
+
+DEFAULT_CONCURRENCY = 4
+
+
+def all_pairs(Primary_levels, Secondary_levels):
+    return [(p, s) for p in sorted(Primary_levels) for s in sorted(Secondary_levels)]
+
+
+def run_crosswalk(client, Primary_levels, Secondary_levels, pairs=None, max_workers=DEFAULT_CONCURRENCY,
+                  taxonomies=(), cache=None, structured=False, metrics=None, per_domain=False, domain_weights=None,
+                  samples=1, early_stop=True):
+    """Yield one result row per level pair, in completion order.
+
+    At most ``max_workers`` level pairs are compared at once; rate-limited
+    requests are retried with backoff inside ``run_comparison``. A pair that
+    still fails yields a row with an ``Error`` entry instead of aborting the
+    whole crosswalk. With ``per_domain=True`` each pair is compared domain by
+    domain (``run_domain_comparison``) and ``structured`` is ignored; with
+    ``samples`` > 1 each pair is scored by the consensus of that many
+    structured answers (``run_consensus``).
+    """
+    pairs = pairs if pairs is not None else all_pairs(Primary_levels, Secondary_levels)
+    if per_domain:
+        compare, options = run_domain_comparison, {"weights": domain_weights}
+    elif samples > 1:
+        compare, options = run_consensus, {"samples": samples, "early_stop": early_stop}
+    else:
+        compare, options = run_comparison, {"structured": structured}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(
+                compare, client,
+                p, Primary_levels[p], s, Secondary_levels[s],
+                taxonomies=taxonomies, cache=cache, metrics=metrics, **options,
+            ): (p, s)
+            for p, s in pairs
+        }
+        for future in as_completed(futures):
+            p, s = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"Primary Level": p, "Secondary Level": s, "Similarity Score": "N/A", "Error": str(e)}
+
+
+def crosswalk_matrix(results, Primary_levels, Secondary_levels):
+    # Primary levels as rows, Secondary levels as columns, scores as cells
+    matrix = pd.DataFrame(index=sorted(Primary_levels), columns=sorted(Secondary_levels), dtype="float")
+    for row in results:
+        score = row.get("Similarity Score")
+        if isinstance(score, (int, float)):
+            matrix.loc[row["Primary Level"], row["Secondary Level"]] = score
+    return matrix
+
+
+def _heat_colour(value):
+    if pd.isna(value):
+        return "background-color: #f0f0f0; color: #999999"
+    # White → red in proportion to the score
+    shade = int(255 - min(max(value, 0), 100) * 2.2)
+    return f"background-color: rgb(255, {shade}, {shade})"
+
+
+def style_heatmap(matrix):
+    return matrix.style.map(_heat_colour).format("{:.0f}", na_rep="…")
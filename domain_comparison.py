@@ -0,0 +1,147 @@
+"""Per-domain level comparison: one small prompt per domain, run in parallel.
+
+Instead of one holistic judgement over a whole level, Knowledge is compared
+with Knowledge, Skills with Skills and Autonomy and Responsibility with
+Autonomy and Responsibility, and the domain scores are combined with
+configurable weights into the level score. The domain prompts carry no level
+names, so a descriptor pair is asked about (and cached) once however many
+level pairs it turns up in.
+
+Frameworks with finer domains (the SA NQF has ten) are grouped into the three
+dimensions first; see ``group_domains``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from comparison import _add_usage, call_gpt_structured, usage_counts
+from llm_backend import as_backend
+from metrics import record_stage, usage_fields
+from nqf_parser import DOMAINS as DIMENSIONS
+from prompts import DOMAIN_PREFIX, DOMAIN_PROMPT_VERSION, DOMAIN_SCHEMA, build_domain_prompt
+from result_cache import make_cache_key
+from scoring import parse_domain_result
+
+DEFAULT_WEIGHTS = {dimension: 1.0 for dimension in DIMENSIONS}
+
+# Checked in order: the first dimension with a keyword in the domain name wins
+_DIMENSION_KEYWORDS = (
+    ("Knowledge", ("knowledge",)),
+    ("Autonomy and Responsibility", ("autonomy", "responsib", "competence", "accountab", "ethic", "context",
+                                     "management of learning")),
+    ("Skills", ("skill", "method", "problem", "information", "communicat")),
+)
+
+
+def dimension_of(domain):
+    """The dimension a framework's domain belongs to, or the domain itself if none matches."""
+    name = str(domain).strip()
+    for dimension, keywords in _DIMENSION_KEYWORDS:
+        if any(keyword in name.lower() for keyword in keywords):
+            return dimension
+    return name
+
+
+def group_domains(descriptors):
+    """{Domain → Descriptor} → {Dimension → text}, in DIMENSIONS order then any unmatched domains."""
+    grouped = {}
+    for domain, descriptor in descriptors.items():
+        grouped.setdefault(dimension_of(domain), []).append((str(domain).strip(), descriptor))
+    texts = {}
+    for dimension in [d for d in DIMENSIONS if d in grouped] + [d for d in grouped if d not in DIMENSIONS]:
+        parts = grouped[dimension]
+        if len(parts) == 1 and parts[0][0] == dimension:
+            texts[dimension] = parts[0][1]
+        else:
+            # Keep the original domain names so the model sees what each part covers
+            texts[dimension] = "\n".join(f"{domain}: {descriptor}" for domain, descriptor in parts)
+    return texts
+
+
+def aggregate_score(domain_scores, weights=None):
+    """Weighted mean of the domain scores, rounded; domains without a weight count once."""
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    scored = [(score, weights.get(domain, 1.0)) for domain, score in domain_scores.items() if score is not None]
+    total_weight = sum(weight for _, weight in scored)
+    if not total_weight:
+        return None
+    return round(sum(score * weight for score, weight in scored) / total_weight)
+
+
+def compare_domain(backend, domain, primary_text, secondary_text, taxonomies=(), cache=None, metrics=None, pair=""):
+    """Score one domain; returns ``(parsed or None, cached, usage)``."""
+    cache_key = make_cache_key(domain, primary_text, domain, secondary_text,
+                               DOMAIN_PREFIX, DOMAIN_PROMPT_VERSION, backend.model, taxonomies)
+    usage = usage_counts(None)
+    with record_stage(metrics, "gpt_call", pair=pair, domain=domain, structured=True) as stage:
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached:
+            parsed = parse_domain_result(cached["result_text"])
+        else:
+            parsed, result_text, usage = call_gpt_structured(
+                backend, build_domain_prompt(domain, primary_text, secondary_text),
+                system=DOMAIN_PREFIX, schema=DOMAIN_SCHEMA, parse=parse_domain_result,
+            )
+            if parsed and cache is not None:
+                cache.set(cache_key, {
+                    "result_text": result_text,
+                    "model": backend.model,
+                    "prompt_version": DOMAIN_PROMPT_VERSION,
+                })
+        stage.update(cache_hit=bool(cached), **usage_fields(usage))
+    return parsed, bool(cached), usage
+
+
+def run_domain_comparison(client, primary_level, primary_descriptors, secondary_level, secondary_descriptors,
+                          weights=None, taxonomies=(), cache=None, metrics=None):
+    """Compare two levels domain by domain and aggregate the domain scores.
+
+    Returns a row in the same shape as ``run_comparison``: ``Domain Scores``
+    holds each domain's score, ``Similarity Score`` their weighted mean and
+    ``Response`` the per-domain rationales. ``Cached`` is True only when every
+    domain came from the cache. Domains present in only one of the two levels
+    are not compared; a domain answer that cannot be validated is left out of
+    the score. Raises ``ValueError`` if the levels share no domain.
+    """
+    backend = as_backend(client)
+    primary = group_domains(primary_descriptors)
+    secondary = group_domains(secondary_descriptors)
+    domains = [domain for domain in primary if domain in secondary]
+    if not domains:
+        raise ValueError(f"No common domains to compare: Primary has {sorted(primary)}, "
+                         f"Secondary has {sorted(secondary)}")
+    pair = f"{primary_level} → {secondary_level}"
+
+    with ThreadPoolExecutor(max_workers=len(domains)) as executor:
+        futures = [
+            executor.submit(compare_domain, backend, domain, primary[domain], secondary[domain],
+                            taxonomies=taxonomies, cache=cache, metrics=metrics, pair=pair)
+            for domain in domains
+        ]
+        answers = dict(zip(domains, (future.result() for future in futures)))
+
+    usage = usage_counts(None)
+    domain_scores = {}
+    sections = []
+    for domain, (parsed, _, domain_usage) in answers.items():
+        usage = _add_usage(usage, domain_usage)
+        if parsed:
+            domain_scores[domain] = parsed["score"]
+            sections.append(f"**{domain}** ({parsed['score']}/100)\n\n{parsed['rationale']}")
+        else:
+            sections.append(f"**{domain}**\n\nThe answer for this domain could not be validated; it is not scored.")
+    score = aggregate_score(domain_scores, weights)
+
+    return {
+        "Primary Level": primary_level,
+        "Secondary Level": secondary_level,
+        "Similarity Score": score if score is not None else "N/A",
+        "Recommended Level": "",
+        "Domain Scores": domain_scores,
+        "Response": "\n\n".join(sections),
+        "Timestamp": datetime.utcnow().isoformat(),
+        "Cached": all(cached for _, cached, _ in answers.values()),
+        "Model": backend.model,
+        "Prompt Version": DOMAIN_PROMPT_VERSION,
+        **usage,
+    }
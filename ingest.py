@@ -0,0 +1,192 @@
+"""Upload ingestion: parse each artefact once per content hash.
+
+Streamlit reruns the whole script on every widget change, so parsing is keyed
+by the SHA-256 of the uploaded bytes and the parsed framework is kept in a
+small process-wide cache. The returned Framework is read-only and is shared by
+every downstream step (previews, prompts, crosswalk, similarity) and by every
+session that uploads the same file.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import pandas as pd
+
+from metrics import record_stage
+from nqf_parser import COLUMNS, iter_nqf_records, iter_page_texts
+from outcome_rules import MIN_OUTCOMES, iter_outcome_records
+
+MAX_CACHED_FRAMEWORKS = 32
+NO_DESCRIPTORS_MESSAGE = "⚠️ No structured descriptors could be extracted from the PDF."
+
+_frameworks = OrderedDict()
+_upload_keys = OrderedDict()    # Streamlit upload file_id → framework key, so reruns skip hashing the bytes
+_lock = threading.Lock()
+
+
+class NoDescriptorsError(RuntimeError):
+    """A PDF with neither level descriptors nor recognisable outcome statements; see outcome_extraction."""
+
+
+@dataclass(frozen=True)
+class Framework:
+    digest: str         # see framework_digest
+    source: str
+    records: tuple      # (Level, Domain, Descriptor) rows as parsed
+    levels: MappingProxyType    # Level → {Domain → Descriptor}, read-only
+    extraction: str = "parsed"  # "parsed" descriptors, outcome statements found by "rules" or by the "model"
+
+    @property
+    def content_digest(self):
+        # The file's SHA-256, whichever way its outcomes were read
+        return self.digest.partition(":")[0]
+
+    def preview(self, n=5):
+        return pd.DataFrame(list(self.records[:n]), columns=COLUMNS)
+
+    def to_frame(self):
+        return pd.DataFrame(list(self.records), columns=COLUMNS)
+
+
+def framework_digest(content_digest, extraction="parsed"):
+    """The file's content digest, tagged with the extraction unless it was parsed as descriptors.
+
+    Outcome statements found by rules and those extracted by the model are
+    different readings of one file, so each gets its own digest and with
+    it its own similarity matrix and comparison history.
+    """
+    return content_digest if extraction == "parsed" else f"{content_digest}:{extraction}"
+
+
+def normalize_level(level):
+    # 7 / "7" → "Level 7"; anything else is kept as written
+    return f"Level {int(level)}" if str(level).strip().isdigit() else str(level).strip()
+
+
+def group_levels(records):
+    """Group rows into Level → {Domain → Descriptor} in a single pass."""
+    levels = {}
+    for level, domain, descriptor in records:
+        domains = levels.setdefault(normalize_level(level), {})
+        domain = str(domain).strip()
+        descriptor = str(descriptor)
+        domains[domain] = f"{domains[domain]}\n{descriptor}" if domain in domains else descriptor
+    return MappingProxyType({level: MappingProxyType(domains) for level, domains in levels.items()})
+
+
+def _read_csv_records(data):
+    content = data.decode("utf-8-sig", errors="ignore")
+    if not content.strip():
+        raise ValueError("Uploaded CSV file is empty.")
+
+    df = pd.read_csv(io.StringIO(content), on_bad_lines="skip")
+    missing = set(COLUMNS) - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    df = df[COLUMNS].dropna()
+    return tuple(df.itertuples(index=False, name=None))
+
+
+def _read_pdf_records(data, filename):
+    # Level descriptors first, streamed page by page; only if there are none are the pages read
+    # again for outcome statements, as one level named after the file
+    records = tuple(iter_nqf_records(data))
+    if records:
+        return records, "parsed"
+    level = os.path.splitext(os.path.basename(filename))[0]
+    records = tuple(iter_outcome_records(iter_page_texts(data), level))
+    if len(records) < MIN_OUTCOMES:
+        raise NoDescriptorsError(NO_DESCRIPTORS_MESSAGE)
+    return records, "rules"
+
+
+def load_framework(data, filename, metrics=None):
+    """Parse uploaded bytes into a Framework, reusing earlier parses of identical content.
+
+    PDFs without level descriptors (job descriptions, module outlines, …)
+    become one level named after the file, holding the outcome statements
+    found by outcome_rules. Fresh parses are timed per stage on the
+    ``metrics`` recorder, if given.
+
+    Raises ``ValueError`` for unsupported or malformed files and
+    ``NoDescriptorsError`` (a ``RuntimeError``) when a PDF yields neither.
+    """
+    source = os.path.splitext(filename)[1].lstrip(".").lower()
+    digest = hashlib.sha256(data).hexdigest()
+    key = (digest, source)
+
+    with _lock:
+        if key in _frameworks:
+            _frameworks.move_to_end(key)
+            return _cached(key)
+
+    extraction = "parsed"
+    if source == "csv":
+        with record_stage(metrics, "upload_decode", source=filename, bytes=len(data)) as stage:
+            records = _read_csv_records(data)
+            stage["records"] = len(records)
+    elif source == "pdf":
+        with record_stage(metrics, "pdf_extraction", source=filename, bytes=len(data)) as stage:
+            try:
+                records, extraction = _read_pdf_records(data, filename)
+            except NoDescriptorsError:
+                # Remembered too, so reruns do not parse a long non-descriptor PDF again just to fail
+                _remember(key, None)
+                raise
+            stage.update(records=len(records), extraction=extraction)
+    else:
+        raise ValueError("Unsupported file format. Please upload a CSV or PDF.")
+
+    with record_stage(metrics, "grouping", source=filename, records=len(records)):
+        levels = group_levels(records)
+    framework = Framework(digest=framework_digest(digest, extraction), source=source, records=records,
+                          levels=levels, extraction=extraction)
+    _remember(key, framework)
+    return framework
+
+
+def _remember(key, framework):
+    with _lock:
+        _frameworks[key] = framework
+        while len(_frameworks) > MAX_CACHED_FRAMEWORKS:
+            _frameworks.popitem(last=False)
+
+
+def _cached(key):
+    # Called with _lock held; None marks a PDF known to hold no level descriptors
+    framework = _frameworks[key]
+    if framework is None:
+        raise NoDescriptorsError(NO_DESCRIPTORS_MESSAGE)
+    return framework
+
+
+def load_upload(uploaded_file, metrics=None):
+    file_id = getattr(uploaded_file, "file_id", None)
+    with _lock:
+        key = _upload_keys.get(file_id)
+        if key in _frameworks:
+            _frameworks.move_to_end(key)
+            return _cached(key)
+
+    try:
+        framework = load_framework(uploaded_file.getvalue(), uploaded_file.name, metrics=metrics)
+    except NoDescriptorsError:
+        _remember_upload(file_id, (hashlib.sha256(uploaded_file.getvalue()).hexdigest(), "pdf"))
+        raise
+    _remember_upload(file_id, (framework.content_digest, framework.source))
+    return framework
+
+
+def _remember_upload(file_id, key):
+    if file_id is None:
+        return
+    with _lock:
+        _upload_keys[file_id] = key
+        while len(_upload_keys) > MAX_CACHED_FRAMEWORKS:
+            _upload_keys.popitem(last=False)
@@ -0,0 +1,141 @@
+"""Adaptive search for the Secondary level that best matches a Primary level.
+
+Level descriptors are ordinal, so rather than comparing a Primary level with
+every Secondary level the search asks the model one small question per probe
+— is the Primary level higher than, lower than or equivalent to this
+Secondary level? — and moves accordingly. It starts from the locally most
+similar level, steps to the neighbouring level first (the local estimate is
+usually off by at most one), gallops while the verdicts keep pointing the
+same way and bisects once the match is bracketed. A typical search takes two
+to four calls; every verdict is cached like any other comparison.
+"""
+
+import re
+from datetime import datetime
+
+from comparison import _add_usage, call_gpt_structured, format_descriptors, usage_counts
+from llm_backend import as_backend
+from metrics import record_stage, usage_fields
+from prompts import SEARCH_PREFIX, SEARCH_PROMPT_VERSION, SEARCH_SCHEMA, build_comparison_prompt
+from result_cache import make_cache_key
+from scoring import parse_level_verdict
+
+_number = re.compile(r"\d+")
+
+
+def level_order(levels):
+    """Level names from least to most demanding: by level number, then by name ("Level 10" after "Level 9")."""
+    def key(level):
+        match = _number.search(str(level))
+        return (0, int(match.group()), str(level)) if match else (1, 0, str(level))
+    return sorted(levels, key=key)
+
+
+def ask_verdict(backend, primary_level, primary_descriptors, secondary_level, secondary_descriptors,
+                taxonomies=(), cache=None, metrics=None):
+    """One probe: ``(parsed verdict or None, cached, usage)``."""
+    cache_key = make_cache_key(primary_level, primary_descriptors, secondary_level, secondary_descriptors,
+                               SEARCH_PREFIX, SEARCH_PROMPT_VERSION, backend.model, taxonomies)
+    usage = usage_counts(None)
+    with record_stage(metrics, "gpt_call", pair=f"{primary_level} → {secondary_level}", search=True) as stage:
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached:
+            parsed = parse_level_verdict(cached["result_text"])
+        else:
+            prompt = build_comparison_prompt(
+                primary_level, format_descriptors(primary_descriptors),
+                secondary_level, format_descriptors(secondary_descriptors),
+            )
+            parsed, result_text, usage = call_gpt_structured(
+                backend, prompt, system=SEARCH_PREFIX, schema=SEARCH_SCHEMA, parse=parse_level_verdict,
+            )
+            if parsed and cache is not None:
+                cache.set(cache_key, {
+                    "result_text": result_text,
+                    "model": backend.model,
+                    "prompt_version": SEARCH_PROMPT_VERSION,
+                })
+        stage.update(cache_hit=bool(cached), **usage_fields(usage))
+    return parsed, bool(cached), usage
+
+
+def search_best_level(client, primary_level, primary_descriptors, Secondary_levels, start=None,
+                      taxonomies=(), cache=None, metrics=None, on_step=None):
+    """Find the best-fitting Secondary level for one Primary level.
+
+    ``start`` is the Secondary level to probe first (e.g. the top local
+    similarity candidate); by default the middle level. ``on_step(step)`` is
+    called after each probe with the step dict appended to ``Steps``.
+
+    Returns a dict with the ``Best Level`` and its ``Similarity Score``, the
+    ``Steps`` taken (Secondary Level, Verdict, Similarity Score, Rationale,
+    Cached), ``Model Calls`` (probes not served from the cache) and the token
+    counts. If no level is judged equivalent, the best-scoring of the two
+    levels bracketing the match is returned.
+    """
+    backend = as_backend(client)
+    order = level_order(Secondary_levels)
+    if not order:
+        raise ValueError("No Secondary levels to search")
+    index = order.index(start) if start in order else (len(order) - 1) // 2
+    low, high = 0, len(order) - 1
+    step_size = 1
+    direction = None
+    bracketed = False
+    steps = []
+    usage = usage_counts(None)
+    best = None
+
+    while low <= high:
+        level = order[index]
+        parsed, cached, call_usage = ask_verdict(
+            backend, primary_level, primary_descriptors, level, Secondary_levels[level],
+            taxonomies=taxonomies, cache=cache, metrics=metrics,
+        )
+        usage = _add_usage(usage, call_usage)
+        if parsed is None:
+            raise ValueError(f"Could not get a valid verdict for {primary_level} → {level}")
+        step = {"Secondary Level": level, "Verdict": parsed["verdict"], "Similarity Score": parsed["similarity_score"],
+                "Rationale": parsed["rationale"], "Cached": cached}
+        steps.append(step)
+        if on_step is not None:
+            on_step(step)
+
+        if parsed["verdict"] == "equivalent":
+            best = step
+            break
+        if parsed["verdict"] == "higher":
+            low, new_direction = index + 1, 1
+        else:
+            high, new_direction = index - 1, -1
+        if low > high:
+            break
+
+        # Gallop away from the estimate until the verdict flips, then bisect the bracket
+        bracketed = bracketed or (direction is not None and new_direction != direction)
+        direction = new_direction
+        if bracketed:
+            index = (low + high) // 2
+        else:
+            index = min(max(index + direction * step_size, low), high)
+            step_size *= 2
+
+    if best is None:
+        # No "equivalent": the match lies between the two neighbouring levels that bracket it
+        # (both already probed; only one at either end of the framework); take the closer by score
+        neighbours = [s for s in steps if order.index(s["Secondary Level"]) in (high, low)]
+        best = max(neighbours or steps, key=lambda s: s["Similarity Score"])
+
+    return {
+        "Primary Level": primary_level,
+        "Best Level": best["Secondary Level"],
+        "Similarity Score": best["Similarity Score"],
+        "Verdict": best["Verdict"],
+        "Steps": steps,
+        "Model Calls": sum(1 for s in steps if not s["Cached"]),
+        "Levels": len(order),
+        "Timestamp": datetime.utcnow().isoformat(),
+        "Model": backend.model,
+        "Prompt Version": SEARCH_PROMPT_VERSION,
+        **usage,
+    }
@@ -0,0 +1,176 @@
+"""LLM backend: one pooled, configurable chat-completions client per process.
+
+The OpenAI client keeps an HTTP connection pool, so it is created once per
+(API key, endpoint) and shared by every session and worker thread instead of
+being rebuilt on each Streamlit rerun. Model, endpoint, timeout and retry
+policy come from the environment:
+
+    ASCENDRA_MODEL            model name (default: the model the prompt was written for)
+    ASCENDRA_LLM_BASE_URL     OpenAI-compatible endpoint, e.g. http://127.0.0.1:8765/v1
+                              for the local stand-in server (llm_standin.py)
+    ASCENDRA_LLM_TIMEOUT      request timeout in seconds
+    ASCENDRA_LLM_MAX_RETRIES  retries on rate limiting and server errors
+    ASCENDRA_LLM_RPM          account requests per minute (0 = unlimited)
+    ASCENDRA_LLM_TPM          account tokens per minute (0 = unlimited)
+
+Every backend for the same account shares one FairScheduler, so concurrent
+sessions queue fairly within the account limits instead of failing with 429s.
+Unless set, the limits default to OpenAI's usage tier 1 on the OpenAI API and
+to none on any other endpoint (the stand-in, a local or proxy server).
+"""
+
+import os
+import random
+import time
+from functools import lru_cache
+
+from openai import InternalServerError, OpenAI, RateLimitError
+
+from prompts import MODEL_NAME
+from rate_limiter import FairScheduler
+
+DEFAULT_MODEL = os.environ.get("ASCENDRA_MODEL", MODEL_NAME)
+DEFAULT_BASE_URL = os.environ.get("ASCENDRA_LLM_BASE_URL") or None
+DEFAULT_TIMEOUT = float(os.environ.get("ASCENDRA_LLM_TIMEOUT", 120))
+DEFAULT_MAX_RETRIES = int(os.environ.get("ASCENDRA_LLM_MAX_RETRIES", 4))
+DEFAULT_BASE_DELAY = 2.0
+# gpt-4o usage tier 1 limits, for the OpenAI API only; raise them to match the account
+OPENAI_RPM = 500
+OPENAI_TPM = 30000
+DEFAULT_RPM = os.environ.get("ASCENDRA_LLM_RPM")
+DEFAULT_TPM = os.environ.get("ASCENDRA_LLM_TPM")
+COMPLETION_TOKEN_ESTIMATE = 1000    # charged up front, settled against the real usage afterwards
+
+
+def _retry_delay(error, attempt, base_delay):
+    # Honour the server's Retry-After when present, otherwise back off exponentially with jitter
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+
+
+def estimate_tokens(messages, kwargs):
+    # ~4 characters per token, plus room for the answer (each of them, when n answers are asked for)
+    prompt = sum(len(message.get("content") or "") for message in messages) // 4
+    return prompt + kwargs.get("max_tokens", COMPLETION_TOKEN_ESTIMATE) * kwargs.get("n", 1)
+
+
+class LLMBackend:
+    """A chat-completions client plus the model, retry policy and scheduler to use with it.
+
+    ``client`` is anything with OpenAI's ``chat.completions.create``: the SDK
+    client, or a stub in benchmarks. Requests go through ``scheduler`` (if
+    any) in the queue of ``user``; see ``for_user``.
+    """
+
+    def __init__(self, client, model=DEFAULT_MODEL, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 scheduler=None, user=None, on_wait=None):
+        self.client = client
+        self.model = model
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.scheduler = scheduler
+        self.user = user
+        self.on_wait = on_wait
+
+    def for_user(self, user, on_wait=None):
+        """The same client and scheduler, queueing requests as ``user``.
+
+        ``on_wait(position)`` is called with the number of requests ahead
+        while a request waits for its turn.
+        """
+        return LLMBackend(self.client, self.model, self.max_retries, self.base_delay,
+                          scheduler=self.scheduler, user=user, on_wait=on_wait)
+
+    def create(self, messages, **kwargs):
+        """``chat.completions.create`` for this backend's model.
+
+        Waits for a slot within the account limits first. Rate-limited (429)
+        and server-error (5xx) responses are retried with jittered
+        exponential backoff; a 429 also pauses every other queued request.
+        The token estimate is charged once per call and settled against the
+        reported usage; a stream is settled from its final chunk, so ask for
+        it with ``stream_options={"include_usage": True}``.
+        """
+        estimate = estimate_tokens(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            if self.scheduler is not None:
+                # Every attempt is a request, but only the first charges the estimate: a failed
+                # attempt's tokens are not billed against the limit
+                self.scheduler.acquire(self.user, estimate if attempt == 0 else 0, on_wait=self.on_wait)
+            try:
+                response = self.client.chat.completions.create(model=self.model, messages=messages, **kwargs)
+            except (RateLimitError, InternalServerError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = _retry_delay(e, attempt, self.base_delay)
+                if self.scheduler is not None and isinstance(e, RateLimitError):
+                    self.scheduler.pause(delay)
+                time.sleep(delay)
+                continue
+            if self.scheduler is None:
+                return response
+            if kwargs.get("stream"):
+                return self._settle_stream(response, estimate)
+            usage = getattr(response, "usage", None)
+            self.scheduler.settle(estimate, getattr(usage, "total_tokens", None))
+            return response
+
+    def _settle_stream(self, stream, estimate):
+        # With include_usage the last chunk carries the usage of the whole answer
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                self.scheduler.settle(estimate, usage.total_tokens)
+            yield chunk
+
+
+def as_backend(client):
+    # Callers may hand over a bare client; wrap it with the default settings
+    return client if isinstance(client, LLMBackend) else LLMBackend(client)
+
+
+def is_openai_api(base_url):
+    return not base_url or "api.openai.com" in base_url
+
+
+def _limit(value, configured, openai_limit, base_url):
+    # The explicit value, then the environment, then tier 1 on the OpenAI API and none elsewhere
+    for limit in (value, configured):
+        if limit is not None:
+            return int(limit)
+    return openai_limit if is_openai_api(base_url) else 0
+
+
+def get_scheduler(api_key=None, base_url=DEFAULT_BASE_URL, rpm=None, tpm=None):
+    """The request scheduler shared by every backend on this account.
+
+    ``rpm`` and ``tpm`` default to ASCENDRA_LLM_RPM / ASCENDRA_LLM_TPM, else
+    to tier-1 limits on the OpenAI API and no limits elsewhere; 0 disables a
+    limit.
+    """
+    # Limits belong to the account, so every model and session on it shares one scheduler.
+    # Normalise the arguments before caching so default and explicit calls get the same one
+    rpm = _limit(rpm, DEFAULT_RPM, OPENAI_RPM, base_url)
+    tpm = _limit(tpm, DEFAULT_TPM, OPENAI_TPM, base_url)
+    return _get_scheduler(api_key, base_url, rpm, tpm)
+
+
+@lru_cache(maxsize=None)
+def _get_scheduler(api_key, base_url, rpm, tpm):
+    return FairScheduler(rpm=rpm or None, tpm=tpm or None)
+
+
+@lru_cache(maxsize=None)
+def get_backend(api_key=None, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL,
+                timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, rpm=None, tpm=None):
+    """Process-wide backend for these settings; its connection pool is reused by every caller.
+
+    ``rpm`` / ``tpm`` override the account limits; see ``get_scheduler``.
+    """
+    # Retries are handled by LLMBackend so they can honour Retry-After; the SDK's own are disabled
+    client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+    return LLMBackend(client, model=model, max_retries=max_retries, scheduler=get_scheduler(api_key, base_url, rpm, tpm))
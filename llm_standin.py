@@ -0,0 +1,361 @@
+"""Local OpenAI-compatible stand-in server for offline load tests and benchmarks.
+
+Serves ``POST /v1/chat/completions`` (plain, streamed and JSON-schema
+answers: level, per-domain, best-level search verdicts and outcome
+extraction; ``n`` answers per request) and ``GET /v1/models`` with canned or
+templated comparisons after a configurable latency, so the full app can run
+without network access:
+
+    python llm_standin.py --port 8765 --latency 1.5 --token-delay 0.01
+    ASCENDRA_LLM_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=standin streamlit run ascendra.py
+
+A template file may use {primary_level}, {secondary_level}, {score} and
+{circles}; the score is derived from the request so repeated requests get
+the same answer. ``--error-rate`` answers a share of requests with HTTP 429
+to exercise retries.
+
+The Batch API is served too, in memory: ``POST /v1/files`` (batch-input
+uploads), ``GET /v1/files/{id}/content``, ``POST /v1/batches`` and ``GET
+/v1/batches/{id}``. A batch stays in progress for ``--batch-delay``
+seconds, then every line is answered as a chat completion would be.
+"""
+
+import argparse
+import email.parser
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_DELAY = 5.0
+# The provider caches prompts of at least this many tokens, in steps of CACHE_STEP_TOKENS
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+# Level names arrive as written in the prompt, usually "Level 6"
+DEFAULT_TEMPLATE = """**Comparison of Primary {primary_level} and Secondary {secondary_level}**
+
+Knowledge: both levels expect a comparable depth and breadth of knowledge.
+
+Skills: the cognitive and practical skills described are closely related.
+
+Autonomy and Responsibility: the degree of independence expected is similar.
+
+Recommendation: Secondary {secondary_level} is the closest match.
+
+Similarity score: {score}/100
+
+{circles}"""
+
+_primary = re.compile(r"Primary Level\s+(.+?):\s*$", re.MULTILINE)
+_secondary = re.compile(r"Secondary Level\s+(.+?):\s*$", re.MULTILINE)
+_domain = re.compile(r"^Domain:\s*(.+?)\s*$", re.MULTILINE)
+_batch_path = re.compile(r"/batches/([^/]+)$")
+_file_content_path = re.compile(r"/files/([^/]+)/content$")
+
+
+def _approx_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _prefix_hashes(text):
+    # One hash per cacheable prefix length: 1024 tokens, 1152, 1280, … (at ~4 characters per token)
+    return [hashlib.sha256(text[:tokens * 4].encode("utf-8")).hexdigest()
+            for tokens in range(CACHE_MIN_TOKENS, len(text) // 4 + 1, CACHE_STEP_TOKENS)]
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+
+    # Set by serve()
+    template = DEFAULT_TEMPLATE
+    latency = 0.0
+    token_delay = 0.0
+    error_rate = 0.0
+    batch_delay = 0.0
+    seen_prefixes = set()
+    files = {}
+    batches = {}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        batch = _batch_path.search(path)
+        content = _file_content_path.search(path)
+        if path.endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "standin", "object": "model", "owned_by": "local"}]})
+        elif batch and batch.group(1) in self.batches:
+            self._send_json(200, self.batches[batch.group(1)])
+        elif content and content.group(1) in self.files:
+            body = self.files[content.group(1)]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length)
+        path = self.path.rstrip("/")
+        if path.endswith("/files"):
+            self._send_json(200, self.store_file(data))
+            return
+        request = json.loads(data or b"{}")
+        if path.endswith("/batches"):
+            self._send_json(200, self.create_batch(request))
+            return
+        if not path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        if random.random() < self.error_rate:
+            self._send_json(429, {"error": {"message": "Rate limit reached (stand-in)", "type": "rate_limit_error"}},
+                            headers={"Retry-After": "1"})
+            return
+
+        time.sleep(self.latency)
+        if request.get("stream"):
+            content = self.answer(request)
+            self.stream(request, content, self.usage(request, content))
+        else:
+            self._send_json(200, self.completion(request))
+
+    def completion(self, request):
+        contents = [self.answer(request, sample) for sample in range(max(1, int(request.get("n") or 1)))]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "standin"),
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                for i, content in enumerate(contents)
+            ],
+            "usage": self.usage(request, "".join(contents)),
+        }
+
+    def store_file(self, data):
+        # multipart/form-data with a "purpose" field and a "file" part
+        message = email.parser.BytesParser().parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("latin-1") + data
+        )
+        parts = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+        content = parts["file"].get_payload(decode=True)
+        file = {
+            "id": f"file-{uuid.uuid4().hex}",
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": parts["file"].get_filename() or "upload.jsonl",
+            "purpose": parts["purpose"].get_payload() if "purpose" in parts else "batch",
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file["id"]] = {**file, "content": content}
+        return file
+
+    def create_batch(self, request):
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": request.get("endpoint"),
+            "input_file_id": request.get("input_file_id"),
+            "completion_window": request.get("completion_window"),
+            "metadata": request.get("metadata"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        self.batches[batch["id"]] = batch
+        threading.Thread(target=self.run_batch, args=(batch,), daemon=True).start()
+        return batch
+
+    def run_batch(self, batch):
+        time.sleep(self.batch_delay)
+        file = self.files.get(batch["input_file_id"])
+        if file is None:
+            batch.update(status="failed", errors={"data": [{"message": "input file not found"}]})
+            return
+        lines = []
+        for line in file["content"].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            response = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": self.completion(request["body"])}
+            lines.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "response": response,
+                "error": None,
+            }))
+        output = self.store_output("\n".join(lines).encode("utf-8"), f"{batch['id']}_output.jsonl")
+        batch.update(status="completed", output_file_id=output, completed_at=int(time.time()),
+                     request_counts={"total": len(lines), "completed": len(lines), "failed": 0})
+
+    def store_output(self, content, filename):
+        file_id = f"file-{uuid.uuid4().hex}"
+        with self.lock:
+            self.files[file_id] = {"id": file_id, "object": "file", "bytes": len(content), "filename": filename,
+                                   "created_at": int(time.time()), "purpose": "batch_output", "status": "processed",
+                                   "content": content}
+        return file_id
+
+    def answer(self, request, sample=0):
+        prompt = request["messages"][-1]["content"] if request.get("messages") else ""
+        primary = _primary.search(prompt)
+        secondary = _secondary.search(prompt)
+        score = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % 101
+        if sample:
+            # Further samples (n > 1) scatter around the first, as sampled answers do
+            jitter = int(hashlib.sha256(f"{prompt}#{sample}".encode("utf-8")).hexdigest(), 16) % 25 - 12
+            score = max(0, min(100, score + jitter))
+        fields = {
+            "primary_level": primary.group(1) if primary else "?",
+            "secondary_level": secondary.group(1) if secondary else "?",
+            "score": score,
+            "circles": "🔴" * round(score / 10) + "⚪" * (10 - round(score / 10)),
+        }
+        text = self.template.format(**fields)
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") != "json_schema":
+            return text
+        schema_name = response_format.get("json_schema", {}).get("name")
+        if schema_name == "outcome_extraction":
+            # Longer lines of the chunk stand in for its outcomes, dealt out over the three domains
+            lines = [line.strip() for line in prompt.splitlines()[1:] if len(line.strip()) > 40][:6]
+            domains = ("Knowledge", "Skills", "Autonomy and Responsibility")
+            return json.dumps({"outcomes": [{"domain": domains[i % 3], "outcome": line} for i, line in enumerate(lines)]})
+        if schema_name == "outcome_reduction":
+            return json.dumps({"outcomes": [line[2:] for line in prompt.splitlines() if line.startswith("- ")][:12]})
+        if schema_name == "level_verdict":
+            # Judge by the level numbers, so the best-level search has a well-defined answer
+            numbers = [re.search(r"\d+", field) for field in (fields["primary_level"], fields["secondary_level"])]
+            difference = int(numbers[0].group()) - int(numbers[1].group()) if all(numbers) else 0
+            return json.dumps({
+                "verdict": "higher" if difference > 0 else "lower" if difference < 0 else "equivalent",
+                "similarity_score": max(0, 90 - 20 * abs(difference)),
+                "rationale": "Stand-in verdict from the level numbers.",
+            })
+        if schema_name == "domain_comparison":
+            domain = _domain.search(prompt)
+            return json.dumps({
+                "score": score,
+                "rationale": f"The {domain.group(1) if domain else 'domain'} descriptors are comparable in depth "
+                             "and complexity (stand-in answer).",
+            })
+        return json.dumps({
+            "similarity_score": score,
+            "recommended_secondary_level": fields["secondary_level"],
+            "domain_scores": [
+                {"domain": domain, "score": max(0, min(100, score + offset))}
+                for domain, offset in (("Knowledge", 5), ("Skills", 0), ("Autonomy and Responsibility", -5))
+            ],
+            "narrative": text,
+        })
+
+    def usage(self, request, content):
+        messages = request.get("messages") or []
+        prompt_tokens = sum(_approx_tokens(m.get("content") or "") for m in messages)
+        # Mimic provider prompt caching: the longest prefix of at least 1024 tokens, in 128-token
+        # steps, that an earlier prompt shared counts as cached
+        hashes = _prefix_hashes("".join(m.get("content") or "" for m in messages))
+        with self.lock:
+            matched = 0
+            while matched < len(hashes) and hashes[matched] in self.seen_prefixes:
+                matched += 1
+            self.seen_prefixes.update(hashes)
+        cached = CACHE_MIN_TOKENS + CACHE_STEP_TOKENS * (matched - 1) if matched else 0
+        completion_tokens = _approx_tokens(content)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    def stream(self, request, content, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "standin"),
+        }
+
+        def send(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        for piece in re.findall(r"\S+\s*|\s+", content):
+            send(json.dumps({**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}))
+            time.sleep(self.token_delay)
+        send(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send(json.dumps({**base, "choices": [], "usage": usage}))
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, template=DEFAULT_TEMPLATE, latency=0.0, token_delay=0.0, error_rate=0.0,
+          batch_delay=DEFAULT_BATCH_DELAY):
+    """Build the stand-in server; call ``serve_forever()`` on it (e.g. from a thread in tests)."""
+    handler = type("Handler", (StandinHandler,), {
+        "template": template, "latency": latency, "token_delay": token_delay, "error_rate": error_rate,
+        "batch_delay": batch_delay, "seen_prefixes": set(), "files": {}, "batches": {}, "lock": threading.Lock(),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in for offline load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    parser.add_argument("--batch-delay", type=float, default=DEFAULT_BATCH_DELAY,
+                        help="Seconds a batch stays in progress before it is answered")
+    parser.add_argument("--template", help="File with the answer template ({primary_level}, {secondary_level}, {score}, {circles})")
+    args = parser.parse_args(argv)
+
+    template = DEFAULT_TEMPLATE
+    if args.template:
+        with open(args.template, encoding="utf-8") as f:
+            template = f.read()
+
+    server = serve(args.host, args.port, template, args.latency, args.token_delay, args.error_rate, args.batch_delay)
+    print(f"Stand-in LLM listening on http://{args.host}:{args.port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
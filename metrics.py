@@ -0,0 +1,94 @@
+"""Lightweight per-stage timing and token instrumentation.
+
+Each pipeline stage (upload decode, PDF extraction, grouping, GPT call, score
+parsing, PDF rendering) is wrapped in ``record_stage``, which measures wall
+time and lets the stage add its own fields: bytes processed, token counts,
+cache hits. Records are kept in memory for the admin panel and appended as
+JSON lines to METRICS_FILE for offline analysis.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+from result_cache import DEFAULT_CACHE_DIR
+
+METRICS_FILE = os.environ.get("ASCENDRA_METRICS_FILE", os.path.join(DEFAULT_CACHE_DIR, "metrics.jsonl"))
+SUMMED_FIELDS = ["bytes", "prompt_tokens", "cached_tokens", "completion_tokens"]
+
+_file_lock = threading.Lock()
+
+
+def append_jsonl(path, records):
+    with _file_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+class MetricsRecorder:
+    """Collects stage records for one session; safe to use from worker threads."""
+
+    def __init__(self, session=None, path=METRICS_FILE, max_records=1000):
+        self.session = session
+        self.path = path
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        record = {"stage": name, **fields}
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 6)
+            self.add(record)
+
+    def add(self, record):
+        record = {"ts": datetime.utcnow().isoformat(), "session": self.session, **record}
+        with self._lock:
+            self.records.append(record)
+        if self.path:
+            try:
+                append_jsonl(self.path, [record])
+            except OSError:
+                pass    # metrics must never break a run
+
+    def to_frame(self):
+        with self._lock:
+            return pd.DataFrame(list(self.records))
+
+    def summary(self):
+        """Per-stage count, wall time, bytes, tokens and cache hits."""
+        df = self.to_frame()
+        if df.empty:
+            return df
+        for field in SUMMED_FIELDS + ["cache_hit"]:
+            if field not in df:
+                df[field] = 0
+        df["cache_hit"] = df["cache_hit"].fillna(False).astype(bool)
+        grouped = df.groupby("stage", sort=False)
+        summary = grouped["seconds"].agg(calls="count", total_s="sum", mean_s="mean", max_s="max")
+        summary = summary.join(grouped[SUMMED_FIELDS].sum()).join(grouped["cache_hit"].sum().rename("cache_hits"))
+        return summary.round(3)
+
+
+def record_stage(metrics, name, **fields):
+    # Stages are optional everywhere: without a recorder the record dict is simply discarded
+    return metrics.stage(name, **fields) if metrics is not None else nullcontext({})
+
+
+def usage_fields(usage):
+    # "Prompt Tokens" → "prompt_tokens"
+    return {key.lower().replace(" ", "_"): value for key, value in usage.items()}
@@ -0,0 +1,178 @@
+"""Parser for level descriptor PDFs.
+
+Understands the SA NQF layout ("22. NQF Level Seven" followed by lettered
+"a. Scope of knowledge, in respect of which ..." domains) as well as the
+plainer "Level 5" / "Knowledge: ..." layout. Pages are read one at a time and
+records are yielded as soon as a descriptor is complete, so memory use does
+not grow with the size of the document and nothing is written to disk.
+
+PyMuPDF and pandas are imported on first use, so loading this module (e.g.
+for COLUMNS when only CSVs are uploaded) stays cheap.
+"""
+
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+COLUMNS = ["Level", "Domain", "Descriptor"]
+# The domains of the EQF / ACQF descriptors, which every comparison prompt is written for
+DOMAINS = ("Knowledge", "Skills", "Autonomy and Responsibility")
+
+# Below this many pages a process pool costs more to start than it saves
+PARALLEL_MIN_PAGES = int(os.environ.get("ASCENDRA_PARALLEL_MIN_PAGES", 64))
+MIN_PAGES_PER_WORKER = 16
+
+LEVEL_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+
+_page_number = re.compile(r"^\d+$")
+# A heading is the whole line ("22. NQF Level Seven", "Level 5:"), so prose starting "Level two ..." is not one
+_level = re.compile(
+    r"^(?:\d{1,2}\.\s*)?(?:NQF\s+)?Level\s+(" + "|".join(LEVEL_WORDS) + r"|\d{1,2})\s*[:.]?$",
+    re.IGNORECASE,
+)
+_letter = re.compile(r"^([a-j])\.(?:\s+(.*))?$", re.IGNORECASE)
+_in_respect_of = re.compile(r"^(.*?),\s*in respect of\s*(.*)$", re.IGNORECASE)
+_keyword_domain = re.compile(
+    r"^(Knowledge|Skills|Competence|Autonomy and Responsibility|Autonomy|Responsibility)\s*(?::\s*(.*))?$",
+    re.IGNORECASE,
+)
+# Keyword headings → DOMAINS, so PDF domains match the CSVs and the per-domain prompts
+# ("Competence" is the EQF's name, before 2017, for autonomy and responsibility)
+KEYWORD_DOMAINS = {"knowledge": DOMAINS[0], "skills": DOMAINS[1]}
+KEYWORD_DOMAINS.update(dict.fromkeys(("competence", "autonomy and responsibility", "autonomy", "responsibility"),
+                                     DOMAINS[2]))
+
+
+def _pdf_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    source.seek(0)
+    data = source.read()
+    if isinstance(data, str):
+        raise TypeError("Expected bytes, got string.")
+    return data
+
+
+def _extract_page_range(pdf_bytes, start, stop):
+    # Runs in a worker process: each worker opens its own copy of the document
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def iter_page_texts(source, workers=None, min_pages=PARALLEL_MIN_PAGES):
+    """Yield the text of each page in order.
+
+    Documents with at least ``min_pages`` pages are split into contiguous
+    page ranges and extracted by a process pool; smaller ones are read in
+    this process, one page at a time.
+    """
+    import fitz  # PyMuPDF
+
+    pdf_bytes = _pdf_bytes(source)
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception as e:
+        raise RuntimeError(f"Error while opening PDF: {e}")
+
+    with doc:
+        page_count = doc.page_count
+        workers = min(workers or os.cpu_count() or 1, math.ceil(page_count / MIN_PAGES_PER_WORKER))
+        if page_count < min_pages or workers < 2:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    step = math.ceil(page_count / workers)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    # spawn rather than fork: the Streamlit server process is multi-threaded
+    with ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_extract_page_range, pdf_bytes, start, stop) for start, stop in ranges]
+        for future in futures:
+            yield from future.result()
+
+
+def iter_pdf_lines(source, workers=None):
+    """Yield stripped, non-empty text lines page by page, skipping bare page numbers."""
+    for text in iter_page_texts(source, workers=workers):
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not _page_number.match(line):
+                yield line
+
+
+def iter_nqf_records(source=None, lines=None):
+    """Yield (Level, Domain, Descriptor) records from a PDF (bytes or file-like) or from text lines."""
+    if lines is None:
+        lines = iter_pdf_lines(source)
+
+    level = None
+    domain = None
+    pending_letter = False   # "f." on its own line, domain name follows on the next line
+    parts = []
+
+    for line in lines:
+        level_match = _level.match(line)
+        if level_match:
+            if level and domain and parts:
+                yield level, domain, " ".join(parts)
+            word = level_match.group(1).lower()
+            level = LEVEL_WORDS.get(word, word)
+            domain = None
+            pending_letter = False
+            parts = []
+            continue
+
+        if level is None:
+            continue
+
+        letter_match = _letter.match(line)
+        if letter_match or pending_letter:
+            rest = (letter_match.group(2) if letter_match else line) or ""
+            if not rest:
+                pending_letter = True
+                continue
+            if domain and parts:
+                yield level, domain, " ".join(parts)
+            pending_letter = False
+            respect_match = _in_respect_of.match(rest)
+            if respect_match:
+                domain = respect_match.group(1).strip()
+                parts = [respect_match.group(2)] if respect_match.group(2) else []
+            else:
+                domain = rest.strip()
+                parts = []
+            continue
+
+        keyword_match = _keyword_domain.match(line)
+        if keyword_match:
+            if domain and parts:
+                yield level, domain, " ".join(parts)
+            domain = KEYWORD_DOMAINS[keyword_match.group(1).lower()]
+            parts = [keyword_match.group(2)] if keyword_match.group(2) else []
+            continue
+
+        if domain:
+            parts.append(line)
+
+    if level and domain and parts:
+        yield level, domain, " ".join(parts)
+
+
+def parse_nqf_pdf_format(source):
+    """Parse a level descriptor PDF into a Level/Domain/Descriptor DataFrame.
+
+    Raises ``RuntimeError`` if the PDF cannot be opened or yields no descriptors.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(iter_nqf_records(source), columns=COLUMNS)
+    if df.empty:
+        raise RuntimeError("⚠️ No structured descriptors could be extracted from the PDF.")
+    return df
@@ -0,0 +1,277 @@
+"""Map-reduce extraction of learning outcomes from long artefacts.
+
+Curricula, job descriptions, microcredentials and similar PDFs are not laid
+out as level descriptors and can run to hundreds of pages, far more than fits
+in one prompt. They are processed in three bounded steps:
+
+1. chunk: consecutive pages are packed into chunks of at most CHUNK_CHARS
+   (over-long pages are split at paragraph, then line boundaries)
+2. map: the learning outcomes of every chunk are extracted in parallel, each
+   chunk cached on its own so a re-upload or a shared section costs nothing
+3. reduce: outcomes are de-duplicated per domain and, where they exceed
+   OUTCOME_BUDGET_CHARS, consolidated by the model in batches until they fit
+
+The result is a one-level Framework (the artefact) with Knowledge, Skills and
+Autonomy and Responsibility descriptors, ready for any comparison mode. It is
+used where the pattern rules of outcome_rules find no outcome statements, or
+when the user asks for the model's reading instead.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from comparison import _add_usage, call_gpt_structured, usage_counts
+from ingest import Framework, framework_digest, group_levels
+from llm_backend import as_backend
+from metrics import record_stage, usage_fields
+from nqf_parser import DOMAINS, iter_page_texts
+from outcome_rules import OUTCOME_BUDGET_CHARS
+from prompts import (
+    EXTRACTION_PREFIX, EXTRACTION_PROMPT_VERSION, EXTRACTION_SCHEMA, REDUCE_PREFIX, REDUCE_SCHEMA,
+    build_extraction_prompt, build_reduce_prompt,
+)
+from result_cache import make_text_key, normalize_text
+
+CHUNK_CHARS = 12000             # ≈ 3k tokens per extraction prompt, well inside any context window
+REDUCE_BATCH_CHARS = 12000
+MAX_REDUCE_ROUNDS = 4
+MAX_ANSWER_TOKENS = 1500        # bounds the latency of each call
+DEFAULT_CONCURRENCY = 8
+MAX_CACHED_ARTEFACTS = 16
+
+_artefacts = OrderedDict()     # (content digest, model) → (framework, stats)
+_lock = threading.Lock()
+
+
+def _split(text, max_chars, separators=("\n\n", "\n", " ")):
+    # Split text into pieces of at most max_chars, at the coarsest boundary that works
+    if len(text) <= max_chars:
+        return [text]
+    if not separators:
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+    separator, rest = separators[0], separators[1:]
+    pieces, current = [], ""
+    for part in text.split(separator):
+        for piece in _split(part, max_chars, rest):
+            if current and len(current) + len(separator) + len(piece) > max_chars:
+                pieces.append(current)
+                current = piece
+            else:
+                current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_pages(pages, max_chars=CHUNK_CHARS):
+    """Pack page texts, in order, into chunks of at most ``max_chars``."""
+    chunks, current = [], ""
+    for page in pages:
+        page = page.strip()
+        if not page:
+            continue
+        for piece in _split(page, max_chars):
+            if current and len(current) + 2 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _load_json(text):
+    try:
+        data = json.loads(text or "")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"not valid JSON ({e})")
+    if not isinstance(data, dict) or not isinstance(data.get("outcomes"), list):
+        raise ValueError("expected a JSON object with an 'outcomes' list")
+    return data["outcomes"]
+
+
+def parse_extracted_outcomes(text):
+    """Validate an extraction answer (EXTRACTION_SCHEMA) into ``[(domain, outcome)]``; raises ``ValueError``."""
+    outcomes = []
+    for entry in _load_json(text):
+        if not isinstance(entry, dict) or entry.get("domain") not in DOMAINS:
+            raise ValueError(f"each outcome needs a 'domain' out of {list(DOMAINS)}")
+        if not isinstance(entry.get("outcome"), str):
+            raise ValueError("each outcome needs an 'outcome' string")
+        if entry["outcome"].strip():
+            outcomes.append((entry["domain"], entry["outcome"].strip()))
+    return outcomes
+
+
+def parse_reduced_outcomes(text):
+    """Validate a reduction answer (REDUCE_SCHEMA) into a list of outcomes; raises ``ValueError``."""
+    outcomes = _load_json(text)
+    if not all(isinstance(outcome, str) for outcome in outcomes):
+        raise ValueError("'outcomes' must be a list of strings")
+    return [outcome.strip() for outcome in outcomes if outcome.strip()]
+
+
+def _cached_call(backend, cache, prompt, system, schema, parse):
+    # One structured call, served from / stored in the result cache by the exact prompt it sends
+    key = make_text_key(prompt, system, EXTRACTION_PROMPT_VERSION, backend.model)
+    cached = cache.get(key) if cache is not None else None
+    if cached:
+        return parse(cached["result_text"]), True, usage_counts(None)
+    parsed, text, usage = call_gpt_structured(backend, prompt, system=system, schema=schema, parse=parse,
+                                              max_tokens=MAX_ANSWER_TOKENS)
+    if parsed is not None and cache is not None:
+        cache.set(key, {"result_text": text, "model": backend.model, "prompt_version": EXTRACTION_PROMPT_VERSION})
+    return parsed, False, usage
+
+
+def _dedupe(outcomes):
+    seen, unique = set(), []
+    for outcome in outcomes:
+        key = normalize_text(outcome).lower().rstrip(".")
+        if key not in seen:
+            seen.add(key)
+            unique.append(outcome)
+    return unique
+
+
+def _batches(outcomes, max_chars):
+    batch, size = [], 0
+    for outcome in outcomes:
+        if batch and size + len(outcome) > max_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(outcome)
+        size += len(outcome)
+    if batch:
+        yield batch
+
+
+def extract_chunk(backend, chunk, cache=None):
+    """Map step for one chunk: ``(outcomes or None, cached, usage)``."""
+    return _cached_call(backend, cache, build_extraction_prompt(chunk), EXTRACTION_PREFIX, EXTRACTION_SCHEMA,
+                        parse_extracted_outcomes)
+
+
+def reduce_outcomes(backend, domain, outcomes, executor, cache=None, budget=OUTCOME_BUDGET_CHARS,
+                    batch_chars=REDUCE_BATCH_CHARS):
+    """Reduce step for one domain: consolidate ``outcomes`` until they fit in ``budget`` characters.
+
+    Each round consolidates batches of at most ``batch_chars`` in parallel,
+    so the depth grows with the log of the document length. Returns
+    ``(outcomes, usage)``.
+    """
+    usage = usage_counts(None)
+    outcomes = _dedupe(outcomes)
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if sum(len(outcome) for outcome in outcomes) <= budget:
+            break
+        batches = list(_batches(outcomes, batch_chars))
+        futures = [
+            executor.submit(_cached_call, backend, cache, build_reduce_prompt(domain, batch), REDUCE_PREFIX,
+                            REDUCE_SCHEMA, parse_reduced_outcomes)
+            for batch in batches
+        ]
+        reduced = []
+        for future, batch in zip(futures, batches):
+            parsed, _, call_usage = future.result()
+            usage = _add_usage(usage, call_usage)
+            reduced.extend(parsed if parsed is not None else batch)    # keep a batch the model failed on
+        reduced = _dedupe(reduced)
+        if len(reduced) >= len(outcomes):
+            break
+        outcomes = reduced
+    # Whatever still does not fit is cut, keeping the earliest outcomes
+    kept, size = [], 0
+    for outcome in outcomes:
+        if kept and size + len(outcome) > budget:
+            break
+        kept.append(outcome)
+        size += len(outcome)
+    return kept, usage
+
+
+def extract_outcomes(client, pages, cache=None, max_workers=DEFAULT_CONCURRENCY, metrics=None, source="",
+                     on_progress=None):
+    """Map-reduce the learning outcomes out of ``pages`` (page texts, in order).
+
+    Returns ``({Domain → [outcome, ...]}, stats)``; stats counts pages,
+    chunks, cached chunks, chunks the model could not answer, and tokens.
+    ``on_progress(done, total)`` is called as chunks complete.
+    """
+    backend = as_backend(client)
+    pages = list(pages)
+    chunks = chunk_pages(pages)
+    stats = {"pages": len(pages), "chunks": len(chunks), "cached_chunks": 0, "failed_chunks": 0}
+    usage = usage_counts(None)
+    collected = {domain: [] for domain in DOMAINS}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        with record_stage(metrics, "outcome_extraction", source=source, chunks=len(chunks)) as stage:
+            futures = [executor.submit(extract_chunk, backend, chunk, cache) for chunk in chunks]
+            for done, future in enumerate(as_completed(futures), start=1):
+                parsed, cached, call_usage = future.result()
+                usage = _add_usage(usage, call_usage)
+                stats["cached_chunks"] += cached
+                stats["failed_chunks"] += parsed is None
+                if on_progress is not None:
+                    on_progress(done, len(chunks))
+            # Collect in document order, so earlier outcomes survive any final cut
+            for future in futures:
+                for domain, outcome in future.result()[0] or ():
+                    collected[domain].append(outcome)
+            stage.update(cache_hits=stats["cached_chunks"], **usage_fields(usage))
+
+        with record_stage(metrics, "outcome_reduction", source=source) as stage:
+            reduce_usage = usage_counts(None)
+            for domain in DOMAINS:
+                collected[domain], domain_usage = reduce_outcomes(backend, domain, collected[domain], executor, cache)
+                reduce_usage = _add_usage(reduce_usage, domain_usage)
+            stage.update(outcomes=sum(len(o) for o in collected.values()), **usage_fields(reduce_usage))
+
+    stats.update(_add_usage(usage, reduce_usage))
+    return {domain: outcomes for domain, outcomes in collected.items() if outcomes}, stats
+
+
+def extract_artefact(data, filename, client, cache=None, max_workers=DEFAULT_CONCURRENCY, metrics=None,
+                     on_progress=None):
+    """Build a one-level Framework from a long PDF artefact; returns ``(framework, stats)``.
+
+    The level is named after the file. Raises ``ValueError`` if no learning
+    outcomes are found.
+    """
+    with record_stage(metrics, "pdf_extraction", source=filename, bytes=len(data)):
+        pages = list(iter_page_texts(data))
+    outcomes, stats = extract_outcomes(client, pages, cache=cache, max_workers=max_workers, metrics=metrics,
+                                       source=filename, on_progress=on_progress)
+    if not outcomes:
+        raise ValueError(f"No learning outcomes could be extracted from {filename}.")
+
+    level = os.path.splitext(os.path.basename(filename))[0]
+    records = tuple((level, domain, outcome) for domain, domain_outcomes in outcomes.items()
+                    for outcome in domain_outcomes)
+    framework = Framework(digest=framework_digest(hashlib.sha256(data).hexdigest(), "model"), source="pdf",
+                          records=records, levels=group_levels(records), extraction="model")
+    return framework, stats
+
+
+def load_artefact(data, filename, client, cache=None, max_workers=DEFAULT_CONCURRENCY, metrics=None,
+                  on_progress=None):
+    """``extract_artefact``, remembered per file content and model for the life of the process."""
+    key = (hashlib.sha256(data).hexdigest(), as_backend(client).model)
+    with _lock:
+        if key in _artefacts:
+            _artefacts.move_to_end(key)
+            return _artefacts[key]
+
+    result = extract_artefact(data, filename, client, cache=cache, max_workers=max_workers, metrics=metrics,
+                              on_progress=on_progress)
+    with _lock:
+        _artefacts[key] = result
+        while len(_artefacts) > MAX_CACHED_ARTEFACTS:
+            _artefacts.popitem(last=False)
+    return result
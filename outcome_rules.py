@@ -0,0 +1,148 @@
+"""Rule-based detection of learning outcome statements in unstructured PDFs.
+
+Job descriptions, module outlines and microcredentials state what a person
+can do in a few recognisable ways: "students will be able to …" clauses,
+bullets that open with an action verb, and lines listed under a heading such
+as "Learning outcomes" or "Key responsibilities". Each page is matched
+against a handful of precompiled patterns in one pass per pattern (no
+line-by-line Python loop), and every statement is assigned a domain from its
+leading verb. No model is called, so a document is structured in
+milliseconds; outcome_extraction remains the fallback for documents these
+rules cannot read.
+"""
+
+import re
+
+from nqf_parser import DOMAINS
+from result_cache import normalize_text
+
+MIN_OUTCOMES = 3        # fewer statements than this and the document is not treated as an outcome list
+MIN_WORDS = 4
+MAX_CHARS = 400
+MAX_SECTION_LINES = 40
+OUTCOME_BUDGET_CHARS = 4000     # per domain, found by rules or by the model: keeps the comparison prompt small
+
+# Leading verbs (and a few verb phrases) by the domain they usually describe
+KNOWLEDGE_VERBS = (
+    "define", "describe", "explain", "identify", "understand", "know", "recall", "recognise", "recognize", "list",
+    "outline", "summarise", "summarize", "discuss", "interpret", "acquire knowledge", "demonstrate knowledge",
+    "demonstrate understanding", "gain", "acquire",
+)
+AUTONOMY_VERBS = (
+    "manage", "lead", "supervise", "coordinate", "co-ordinate", "oversee", "ensure", "monitor", "take responsibility",
+    "be accountable", "be responsible", "responsible for", "accountable for", "collaborate", "work independently",
+    "work closely", "decide", "delegate", "mentor", "motivate", "organise", "organize", "liaise", "reflect",
+    "take ownership", "act",
+)
+SKILL_VERBS = (
+    "apply", "analyse", "analyze", "assess", "evaluate", "design", "develop", "build", "create", "plan", "implement",
+    "conduct", "perform", "use", "operate", "calculate", "solve", "communicate", "present", "prepare", "review",
+    "train", "master", "demonstrate", "show", "display", "formulate", "integrate", "compare", "construct",
+    "produce", "write", "report", "test", "investigate", "research", "select", "critique", "synthesise",
+    "synthesize", "measure", "maintain", "assist", "support", "deliver", "negotiate", "handle", "process", "learn",
+    "think", "generate", "refine", "execute", "program", "model", "interpret data", "draft", "audit", "advise",
+    "teach", "facilitate",
+)
+GENERIC_VERBS = ("demonstrate", "show", "display")
+_VERB_DOMAINS = {verb: "Knowledge" for verb in KNOWLEDGE_VERBS}
+_VERB_DOMAINS.update({verb: "Autonomy and Responsibility" for verb in AUTONOMY_VERBS})
+_VERB_DOMAINS.update({verb: "Skills" for verb in SKILL_VERBS})
+# Longest first, so "responsible for" wins over a shorter verb and "use" does not match "used"
+_VERBS = "|".join(re.escape(verb) for verb in sorted(_VERB_DOMAINS, key=len, reverse=True))
+
+HEADINGS = (
+    "learning outcomes?", "specific outcomes?", "outcomes?", "competenc(?:y|ies)", "key responsibilities",
+    "responsibilities", "duties(?: and responsibilities)?", "key duties", "skills(?: required| you will develop)?",
+    "what you will learn", "you will learn", "key benefits", "job description", "requirements",
+    "on completion(?: of this \\w+)?,? (?:you|students|learners|participants) will(?: be able to)?",
+)
+
+_control = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\xad]")
+# A line break inside a sentence: the next line goes on in lower case
+_wrapped = re.compile(r"[ \t]*\n[ \t]*(?=[a-z(“\"'])")
+_bullet = r"(?:[•▪●◦‣∙·○■□➢►✓\-–—*]|\(?\d{1,2}[.)]|\(?[a-z][.)]|\(?[ivx]{1,4}[.)])"
+# An action-verb line: any case after a bullet, capitalised without one
+_verb_line = re.compile(
+    rf"^[ \t]*(?:{_bullet}[ \t]*(?i:{_VERBS})|(?=[A-Z])(?i:{_VERBS}))\b[^\n]*",
+    re.MULTILINE,
+)
+# "… will be able to: x; y; and z." up to the end of the sentence
+_able_to = re.compile(
+    r"\b(?:(?:be|are|is) able to|able to|(?:achieve|complete)s? this \w+ (?:can|will)|enables? (?:you|students|"
+    r"learners|participants) to|(?:students|learners|participants|graduates) (?:can|will|should))"
+    r"[ \t]*:?[ \t]*([^.\n]+(?:\n(?!\n)[^.\n]+)*)",
+    re.IGNORECASE,
+)
+_section = re.compile(
+    rf"^[ \t]*(?:{'|'.join(HEADINGS)})[ \t]*(?:[:\-–][^\n]*)?\n"
+    rf"((?:[ \t]*{_bullet}[ \t]*[^\n]+(?:\n|$)){{1,{MAX_SECTION_LINES}}})",
+    re.MULTILINE | re.IGNORECASE,
+)
+_leading_bullet = re.compile(rf"^\s*{_bullet}\s*")
+_lead_in = re.compile(r"^(?:and|or|also|to|will|be able to|\s)+\b", re.IGNORECASE)
+_clause_split = re.compile(r";\s*(?:and\s+|or\s+)?|\s*\n\s*")
+_leading_verb = re.compile(rf"^(?:{_VERBS})\b", re.IGNORECASE)
+_knowledge_cue = re.compile(r"\b(?:knowledge|understanding|awareness)\b", re.IGNORECASE)
+_autonomy_cue = re.compile(r"\b(?:responsib|accountab|independen|autonom|self-direct)", re.IGNORECASE)
+_url = re.compile(r"https?://|www\.|\(/", re.IGNORECASE)
+
+
+def normalize_page(text):
+    """Strip control characters and rejoin lines broken in mid-sentence."""
+    return _wrapped.sub(" ", _control.sub("", text))
+
+
+def _clean(statement):
+    statement = _lead_in.sub("", _leading_bullet.sub("", normalize_text(statement))).strip(" ,;:")
+    words = statement.split()
+    if len(words) < MIN_WORDS or len(statement) > MAX_CHARS or _url.search(statement):
+        return None
+    if sum(word[0].islower() for word in words) < 2:
+        return None     # a title or heading, not a sentence
+    return statement[0].upper() + statement[1:]
+
+
+def domain_of(statement):
+    """The domain a statement most likely belongs to: by leading verb, then by cue words, else Skills."""
+    match = _leading_verb.match(statement)
+    # "Demonstrate" says nothing about the domain; "demonstrate an understanding of …" is Knowledge
+    if match and match.group().lower() not in GENERIC_VERBS:
+        return _VERB_DOMAINS[match.group().lower()]
+    if _knowledge_cue.search(statement):
+        return "Knowledge"
+    if _autonomy_cue.search(statement):
+        return "Autonomy and Responsibility"
+    return "Skills"
+
+
+def find_statements(text):
+    """Outcome statements in one page of text, in the order the patterns find them."""
+    text = normalize_page(text)
+    candidates = [match.group() for match in _verb_line.finditer(text)]
+    for match in _section.finditer(text):
+        candidates.extend(match.group(1).splitlines())
+    statements = [statement for statement in map(_clean, candidates) if statement]
+    # Clauses after "able to" only count when they state an action ("be given …" does not)
+    for match in _able_to.finditer(text):
+        clauses = map(_clean, _clause_split.split(match.group(1)))
+        statements.extend(clause for clause in clauses if clause and _leading_verb.match(clause))
+    return statements
+
+
+def iter_outcome_records(pages, level, max_domain_chars=OUTCOME_BUDGET_CHARS):
+    """Yield unique (Level, Domain, Descriptor) records for the outcome statements in ``pages`` (page texts).
+
+    Once a domain holds ``max_domain_chars`` of statements, later ones are
+    left out, so the earliest outcomes of a long document are kept.
+    """
+    seen = set()
+    sizes = dict.fromkeys(DOMAINS, 0)
+    for text in pages:
+        for statement in find_statements(text):
+            key = statement.lower().rstrip(".")
+            domain = domain_of(statement)
+            if key in seen or sizes[domain] + len(statement) > max_domain_chars:
+                continue
+            seen.add(key)
+            sizes[domain] += len(statement)
+            yield level, domain, statement
@@ -0,0 +1,136 @@
+"""Process-wide rate limiting and fair scheduling of model requests.
+
+One FairScheduler sits in front of every call made with the same account.
+It enforces the account's requests-per-minute and tokens-per-minute limits
+with two token buckets, and grants waiting requests round-robin across
+users, so one analyst's 100-pair crosswalk cannot starve another analyst's
+single comparison. When the provider still answers 429 the whole scheduler
+pauses, instead of every session hammering the API with its own retries.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class TokenBucket:
+    """Continuously refilling budget of ``per_minute`` units, holding at most a minute's worth."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.per_minute)    # a request larger than the bucket waits for a full one
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) * 60 / self.per_minute
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.per_minute)
+
+    def adjust(self, amount):
+        # Settle an estimate against the real usage; the balance may go negative
+        self.tokens = min(self.per_minute, self.tokens - amount)
+
+
+class _Ticket:
+    __slots__ = ("user", "tokens")
+
+    def __init__(self, user, tokens):
+        self.user = user
+        self.tokens = tokens
+
+
+class FairScheduler:
+    """Grant requests within RPM / TPM limits, taking turns between users.
+
+    ``rpm`` or ``tpm`` may be None to leave that dimension unlimited. Not
+    re-entrant: a thread must not acquire again before its request is sent.
+    """
+
+    def __init__(self, rpm=None, tpm=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self._queues = OrderedDict()    # user → deque of tickets; order is the round-robin order
+        self._condition = threading.Condition()
+
+    def _wait_time(self, ticket, now):
+        waits = [self.paused_until - now]
+        if self.requests:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens:
+            waits.append(self.tokens.wait_time(ticket.tokens, now))
+        return max(waits)
+
+    def _position(self, ticket):
+        # How many requests will be granted before this one, dealing out one per user per round
+        queues = [list(q) for q in self._queues.values()]
+        position = 0
+        for round_ in range(max(len(q) for q in queues)):
+            for queue in queues:
+                if round_ < len(queue):
+                    if queue[round_] is ticket:
+                        return position
+                    position += 1
+        return position
+
+    def acquire(self, user, tokens=0, on_wait=None):
+        """Block until this user's request may be sent.
+
+        ``on_wait(position)`` is called whenever the number of requests
+        ahead in the queue changes (0 means next, waiting only for budget).
+        """
+        ticket = _Ticket(user, tokens)
+        with self._condition:
+            self._queues.setdefault(user, deque()).append(ticket)
+            last_position = None
+            while True:
+                head_user, head_queue = next(iter(self._queues.items()))
+                if head_queue[0] is ticket:
+                    wait = self._wait_time(ticket, time.monotonic())
+                    if wait <= 0:
+                        break
+                    timeout = wait
+                else:
+                    timeout = 1.0
+                if on_wait is not None:
+                    position = self._position(ticket)
+                    if position != last_position:
+                        last_position = position
+                        on_wait(position)
+                self._condition.wait(timeout)
+
+            # Grant: charge the budgets and move this user to the back of the round-robin
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            head_queue.popleft()
+            del self._queues[head_user]
+            if head_queue:
+                self._queues[head_user] = head_queue
+            self._condition.notify_all()
+
+    def settle(self, estimated, actual):
+        """Correct the token budget once the real usage of a request is known."""
+        if self.tokens and actual is not None:
+            with self._condition:
+                self.tokens.adjust(actual - estimated)
+
+    def pause(self, seconds):
+        """Hold every queued request for ``seconds`` (after a 429 from the provider)."""
+        with self._condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def pending(self, user=None):
+        with self._condition:
+            if user is None:
+                return sum(len(q) for q in self._queues.values())
+            return len(self._queues.get(user, ()))
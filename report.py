@@ -0,0 +1,298 @@
+"""PDF report rendering for comparison results.
+
+Everything that does not change between reports is prepared once per
+process: the DejaVu faces are cut down to the Unicode blocks GPT answers and
+extracted PDF text actually use, written to the cache directory and parsed
+once (each report gets a copy, since rendering subsets the font in place),
+and the logo is downscaled and re-encoded in memory. Text is wrapped with cached glyph widths, so long
+GPT answers are laid out in linear time.
+"""
+
+import copy
+import hashlib
+import io
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+from fpdf.fonts import SubsetMap
+
+from assets import logo_png
+from metrics import record_stage
+from result_cache import DEFAULT_CACHE_DIR
+from scoring import score_circles
+
+FOOTER_TEXT = "Powered by Ascendra | Version 1.0 – April 2025 – Results should be interpreted as advisory"
+FONT_FAMILY = "DejaVu"
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf", "I": "DejaVuSans-Oblique.ttf"}
+LOGO_WIDTH_PX = 320     # printed 40 mm wide, ~200 dpi
+FONT_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "fonts")
+
+# Latin, Greek, Cyrillic, punctuation, currency, arrows, maths, box/geometric
+# shapes, miscellaneous symbols and dingbats (GPT likes ●○✓ for the score bar),
+# plus the ﬁ/ﬂ ligatures and the replacement character found in extracted PDF text
+UNICODE_RANGES = [
+    (0x0020, 0x052F), (0x1E00, 0x1EFF), (0x2000, 0x206F), (0x20A0, 0x20CF),
+    (0x2100, 0x22FF), (0x2500, 0x27BF), (0xFB00, 0xFB06), (0xFFFD, 0xFFFD),
+]
+
+_font_lock = threading.Lock()
+_char_widths = {}
+# Batch reports render here instead of on the Streamlit script thread
+_report_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+
+
+@lru_cache(maxsize=None)
+def _subset_font(font_file):
+    source = os.path.abspath(font_file)
+    with open(source, "rb") as f:
+        # A new file whenever the font or the ranges kept change
+        digest = hashlib.sha256(f.read() + repr(UNICODE_RANGES).encode("ascii") + b"bmp-cmap").hexdigest()[:12]
+    target = os.path.join(FONT_CACHE_DIR, f"{os.path.splitext(os.path.basename(font_file))[0]}-{digest}.ttf")
+
+    with _font_lock:
+        if not os.path.exists(target):
+            os.makedirs(FONT_CACHE_DIR, exist_ok=True)
+            options = subset.Options()
+            options.notdef_outline = True
+            options.glyph_names = False
+            # Layout tables only serve text shaping, which reports do not use, and fpdf drops them on output anyway
+            options.drop_tables += ["FFTM", "GDEF", "GPOS", "GSUB", "MATH"]
+            font = TTFont(source)
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(unicodes=[u for start, stop in UNICODE_RANGES for u in range(start, stop + 1)])
+            subsetter.subset(font)
+            font["post"].formatType = 3.0   # no glyph name table: smaller and faster to load
+            # Every range kept is in the BMP, so the Windows BMP cmap alone maps them all; each report's
+            # subsetting decompiles one cmap instead of three
+            cmap = font["cmap"]
+            cmap.tables = [table for table in cmap.tables if (table.platformID, table.platEncID) == (3, 1)]
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            font.save(tmp_path)
+            os.replace(tmp_path, target)
+    return target
+
+
+class PDFWithFooter(FPDF):
+    def footer(self):
+        self.set_y(-15)
+        self.set_font(FONT_FAMILY, "I", 8)
+        self.set_text_color(128)
+        self.cell(0, 10, FOOTER_TEXT, 0, 0, "C")
+
+
+@lru_cache(maxsize=None)
+def _font_template():
+    # Parsed once per process (metrics, cmap, widths); never rendered, so its fonts stay whole
+    pdf = PDFWithFooter()
+    font_data = {}
+    for style, font_file in FONT_FILES.items():
+        path = _subset_font(font_file)
+        pdf.add_font(FONT_FAMILY, style, path)
+        with open(path, "rb") as f:
+            font_data[f"{FONT_FAMILY.lower()}{style}"] = f.read()
+    return pdf.fonts, font_data
+
+
+def _copy_font(font, data):
+    # Rendering subsets the font file in place, numbers the font descriptor as a PDF object and records
+    # the glyphs used, so each report gets its own of those (the font file opened lazily from memory,
+    # well under a millisecond); the parsed cmap and glyph ids are shared read-only
+    copied = copy.copy(font)
+    copied.ttfont = TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+    # The glyph names are otherwise rebuilt from the cmap when the font is subset (there is no glyph name table)
+    copied.ttfont.setGlyphOrder(list(font.ttfont.getGlyphOrder()))
+    copied.desc = copy.copy(font.desc)
+    copied.cw = copy.copy(font.cw)     # a defaultdict: looking up a missing character adds it
+    copied._hbfont = None
+    copied.missing_glyphs = []
+    copied.biggest_size_pt = 0
+    copied.subset = SubsetMap(copied)
+    return copied
+
+
+def new_report():
+    pdf = PDFWithFooter()
+    fonts, font_data = _font_template()
+    pdf.fonts.update({key: _copy_font(font, font_data[key]) for key, font in fonts.items()})
+    pdf.add_page()
+    pdf.set_font(FONT_FAMILY, size=8)
+    return pdf
+
+
+def _text_width(pdf, text):
+    # Glyph widths are identical across documents, so cache them per font face and size
+    key = (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+    widths = _char_widths.get(key)
+    if widths is None:
+        widths = _char_widths.setdefault(key, {})
+    total = 0.0
+    for char in text:
+        width = widths.get(char)
+        if width is None:
+            width = widths[char] = pdf.get_string_width(char)
+        total += width
+    return total
+
+
+def wrap_lines(pdf, text, max_width):
+    """Split text into lines that fit ``max_width``; each word is measured once."""
+    space = _text_width(pdf, " ")
+    lines = []
+    for paragraph in str(text).split("\n"):
+        line, line_width = [], 0.0
+        for word in paragraph.split():
+            word_width = _text_width(pdf, word)
+            if word_width > max_width:
+                # Unbreakable token wider than the page: hard-break it by character
+                if line:
+                    lines.append(" ".join(line))
+                chunk, chunk_width = [], 0.0
+                for char in word:
+                    char_width = _text_width(pdf, char)
+                    if chunk and chunk_width + char_width > max_width:
+                        lines.append("".join(chunk))
+                        chunk, chunk_width = [], 0.0
+                    chunk.append(char)
+                    chunk_width += char_width
+                line, line_width = ["".join(chunk)], chunk_width
+                continue
+            needed = word_width + (space if line else 0)
+            if line and line_width + needed > max_width:
+                lines.append(" ".join(line))
+                line, line_width = [word], word_width
+            else:
+                line.append(word)
+                line_width += needed
+        lines.append(" ".join(line))
+    return lines
+
+
+def write_text(pdf, text, height=8):
+    if not text:
+        return
+    max_width = pdf.w - pdf.l_margin - pdf.r_margin
+    for line in wrap_lines(pdf, text, max_width):
+        pdf.cell(max_width, height, line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+def _descriptor_lines(descriptors):
+    if isinstance(descriptors, Mapping):
+        return [f"• {domain}: {desc}" for domain, desc in descriptors.items()]
+    return [f"• {descriptors}"]
+
+
+def write_comparison(pdf, primary_level, primary_descriptors, secondary_level, secondary_descriptors, result_text,
+                     score=None):
+    pdf.set_font(FONT_FAMILY, "B", 12)
+    write_text(pdf, f"Primary Level {primary_level}")
+    pdf.set_font(FONT_FAMILY, "", 8)
+    for line in _descriptor_lines(primary_descriptors):
+        write_text(pdf, line)
+    pdf.ln(5)
+
+    pdf.set_font(FONT_FAMILY, "B", 12)
+    write_text(pdf, f"Secondary Level {secondary_level}")
+    pdf.set_font(FONT_FAMILY, "", 8)
+    for line in _descriptor_lines(secondary_descriptors):
+        write_text(pdf, line)
+    pdf.ln(5)
+
+    pdf.set_font(FONT_FAMILY, "B", 12)
+    write_text(pdf, "GPT Comparison Result:")
+    pdf.set_font(FONT_FAMILY, "", 8)
+    write_text(pdf, result_text)
+    if isinstance(score, int):
+        # Structured answers carry no score bar of their own
+        pdf.ln(3)
+        pdf.set_font(FONT_FAMILY, "B", 10)
+        write_text(pdf, f"Similarity score: {score}/100")
+        pdf.set_text_color(200, 0, 0)
+        pdf.set_font(FONT_FAMILY, "", 16)
+        write_text(pdf, score_circles(score, filled="●", empty="○"), height=10)
+        pdf.set_text_color(0)
+        pdf.set_font(FONT_FAMILY, "", 8)
+    pdf.ln(5)
+
+
+def write_header(pdf, title):
+    pdf.image(io.BytesIO(logo_png(LOGO_WIDTH_PX)), x=10, y=8, w=40)
+    pdf.ln(45)
+    pdf.set_font(FONT_FAMILY, "B", 14)
+    write_text(pdf, title)
+    pdf.set_font(FONT_FAMILY, "", 8)
+    write_text(pdf, datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"))
+    pdf.ln(10)
+
+
+def build_comparison_report(primary_level, primary_descriptors, secondary_level, secondary_descriptors, result_text,
+                            score=None):
+    """Render one comparison as a PDF and return its bytes.
+
+    Pass ``score`` to draw the score bar under the text (structured answers).
+    """
+    pdf = new_report()
+    write_header(pdf, "Primary - Secondary Comparison Report")
+    write_comparison(pdf, primary_level, primary_descriptors, secondary_level, secondary_descriptors, result_text,
+                     score=score)
+    return bytes(pdf.output())
+
+
+def _write_summary_table(pdf, results):
+    pdf.set_font(FONT_FAMILY, "B", 12)
+    write_text(pdf, "Crosswalk summary")
+    pdf.set_font(FONT_FAMILY, "", 7)
+
+    primary_levels = sorted({row["Primary Level"] for row in results})
+    secondary_levels = sorted({row["Secondary Level"] for row in results})
+    scores = {(row["Primary Level"], row["Secondary Level"]): row.get("Similarity Score", "N/A") for row in results}
+
+    with pdf.table(first_row_as_headings=True, text_align="CENTER") as table:
+        table.row(["Primary / Secondary"] + [str(level) for level in secondary_levels])
+        for p in primary_levels:
+            table.row([str(p)] + [str(scores.get((p, s), "")) for s in secondary_levels])
+    pdf.ln(5)
+
+
+def build_batch_report(results, Primary_levels=None, Secondary_levels=None):
+    """Render every stored comparison, preceded by a crosswalk summary table, as one PDF."""
+    Primary_levels = Primary_levels or {}
+    Secondary_levels = Secondary_levels or {}
+
+    pdf = new_report()
+    write_header(pdf, f"Primary - Secondary Comparison Report ({len(results)} comparisons)")
+    _write_summary_table(pdf, results)
+
+    for row in results:
+        pdf.add_page()
+        p, s = row["Primary Level"], row["Secondary Level"]
+        pdf.set_font(FONT_FAMILY, "B", 14)
+        write_text(pdf, f"Primary Level {p} - Secondary Level {s} (score: {row.get('Similarity Score', 'N/A')})")
+        # Structured and per-domain answers carry no score bar of their own
+        structured = row.get("Recommended Level") or row.get("Domain Scores")
+        write_comparison(pdf, p, Primary_levels.get(p, {}), s, Secondary_levels.get(s, {}), row.get("Response", ""),
+                         score=row.get("Similarity Score") if structured else None)
+    return bytes(pdf.output())
+
+
+def _timed_batch_report(metrics, results, Primary_levels, Secondary_levels):
+    with record_stage(metrics, "pdf_report", comparisons=len(results)) as stage:
+        pdf_bytes = build_batch_report(results, Primary_levels, Secondary_levels)
+        stage["bytes"] = len(pdf_bytes)
+    return pdf_bytes
+
+
+def submit_batch_report(results, Primary_levels=None, Secondary_levels=None, metrics=None):
+    """Start rendering a batch report in the background and return its Future."""
+    # Snapshot the inputs: the session keeps appending results while the job runs
+    results = [dict(row) for row in results]
+    Primary_levels = {k: dict(v) for k, v in (Primary_levels or {}).items()}
+    Secondary_levels = {k: dict(v) for k, v in (Secondary_levels or {}).items()}
+    return _report_executor.submit(_timed_batch_report, metrics, results, Primary_levels, Secondary_levels)
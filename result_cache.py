@@ -0,0 +1,184 @@
+"""Disk-backed cache for GPT comparison results.
+
+Entries are stored as one JSON file per key under the cache directory, so the
+cache survives restarts and is shared by every session (and every worker
+process) pointing at the same directory.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections.abc import Mapping
+
+DEFAULT_CACHE_DIR = os.environ.get("ASCENDRA_CACHE_DIR", ".ascendra_cache")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024   # 200 MB
+DEFAULT_MAX_AGE = 30 * 24 * 3600        # 30 days
+# Writes between full directory scans, which also expire old entries and count other processes' writes
+SCAN_EVERY = 1000
+# An eviction frees room down to this share of max_bytes, so a full cache is not rescanned on every write
+EVICT_TO = 0.9
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFC", str(text))
+    return _whitespace.sub(" ", text).strip()
+
+
+def normalize_descriptors(descriptors):
+    # Level → {Domain → Descriptor}; domain order must not change the key
+    if isinstance(descriptors, Mapping):
+        return sorted((normalize_text(k), normalize_text(v)) for k, v in descriptors.items())
+    return normalize_text(descriptors)
+
+
+def make_cache_key(primary_level, primary_descriptors, secondary_level, secondary_descriptors,
+                   system_prompt, prompt_version, model, taxonomies=()):
+    payload = {
+        "primary_level": normalize_text(primary_level),
+        "primary": normalize_descriptors(primary_descriptors),
+        "secondary_level": normalize_text(secondary_level),
+        "secondary": normalize_descriptors(secondary_descriptors),
+        "system_prompt": normalize_text(system_prompt),
+        "prompt_version": str(prompt_version),
+        "model": model,
+        "taxonomies": sorted(taxonomies or ()),
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def make_text_key(text, system_prompt, prompt_version, model):
+    """Key for a prompt over a single piece of text, such as one chunk of a document."""
+    payload = {
+        "text": normalize_text(text),
+        "system_prompt": normalize_text(system_prompt),
+        "prompt_version": str(prompt_version),
+        "model": model,
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._size = None       # bytes on disk as of the last scan plus this process's writes since; None: not scanned
+        self._writes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.max_age:
+                os.remove(path)
+                self._resize(-stat.st_size)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Refresh access time so eviction drops the least recently used entries first
+            os.utime(path, (time.time(), stat.st_mtime))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def set(self, key, value):
+        entry = dict(value, key=key, cached_at=time.time())
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Atomic so concurrent readers never see a half-written entry
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # A running total instead of a scan per write; the directory is only scanned when over the cap
+        with self._lock:
+            self._writes += 1
+            if self._size is not None:
+                self._size += len(data) - replaced
+            scan = self._size is None or self._size > self.max_bytes or self._writes % SCAN_EVERY == 0
+        if scan:
+            self.evict()
+
+    def _resize(self, delta):
+        with self._lock:
+            if self._size is not None:
+                self._size += delta
+
+    def evict(self):
+        """Drop expired entries, then, once over ``max_bytes``, the least recently used ones down to EVICT_TO of it."""
+        # One scan at a time, outside the lock that reads and writes take; others skip it
+        if not self._scan_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            target = self.max_bytes * EVICT_TO if total > self.max_bytes else self.max_bytes
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+            with self._lock:
+                self._size = total
+        finally:
+            self._scan_lock.release()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    self._remove(os.path.join(self.cache_dir, name))
+            self._size = 0
@@ -0,0 +1,99 @@
+"""Score extraction and validation for GPT comparison answers."""
+
+import json
+import re
+
+_score_pattern = re.compile(r"similarity score[^\d]*(\d{1,3})", re.IGNORECASE)
+
+
+def extract_score(result_text):
+    # Free-text answers: scrape "Similarity score: 72" from the narrative
+    match = _score_pattern.search(result_text or "")
+    return int(match.group(1)) if match else None
+
+
+def _check_score(value, field):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 100:
+        raise ValueError(f"'{field}' must be an integer between 0 and 100, got {value!r}")
+    return value
+
+
+def parse_structured_result(text):
+    """Validate a structured (JSON) answer and return it as a dict.
+
+    Raises ``ValueError`` describing the first problem found, so the message
+    can be sent back to the model in a repair request.
+    """
+    try:
+        data = json.loads(text or "")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"not valid JSON ({e})")
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+
+    missing = {"similarity_score", "recommended_secondary_level", "domain_scores", "narrative"} - set(data)
+    if missing:
+        raise ValueError(f"missing fields: {sorted(missing)}")
+
+    _check_score(data["similarity_score"], "similarity_score")
+    if not isinstance(data["recommended_secondary_level"], str):
+        raise ValueError("'recommended_secondary_level' must be a string")
+    if not isinstance(data["narrative"], str) or not data["narrative"].strip():
+        raise ValueError("'narrative' must be a non-empty string")
+    if not isinstance(data["domain_scores"], list):
+        raise ValueError("'domain_scores' must be a list")
+    for entry in data["domain_scores"]:
+        if not isinstance(entry, dict) or not isinstance(entry.get("domain"), str):
+            raise ValueError("each 'domain_scores' entry needs a 'domain' string and a 'score'")
+        _check_score(entry.get("score"), f"domain_scores[{entry['domain']}].score")
+
+    return {
+        "similarity_score": data["similarity_score"],
+        "recommended_secondary_level": data["recommended_secondary_level"].strip(),
+        "domain_scores": {entry["domain"]: entry["score"] for entry in data["domain_scores"]},
+        "narrative": data["narrative"].strip(),
+    }
+
+
+def parse_domain_result(text):
+    """Validate a per-domain JSON answer (DOMAIN_SCHEMA); raises ``ValueError`` like ``parse_structured_result``."""
+    try:
+        data = json.loads(text or "")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"not valid JSON ({e})")
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    missing = {"score", "rationale"} - set(data)
+    if missing:
+        raise ValueError(f"missing fields: {sorted(missing)}")
+    _check_score(data["score"], "score")
+    if not isinstance(data["rationale"], str) or not data["rationale"].strip():
+        raise ValueError("'rationale' must be a non-empty string")
+    return {"score": data["score"], "rationale": data["rationale"].strip()}
+
+
+def parse_level_verdict(text):
+    """Validate a best-level search answer (SEARCH_SCHEMA); raises ``ValueError`` like ``parse_structured_result``."""
+    try:
+        data = json.loads(text or "")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"not valid JSON ({e})")
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    missing = {"verdict", "similarity_score", "rationale"} - set(data)
+    if missing:
+        raise ValueError(f"missing fields: {sorted(missing)}")
+    verdict = str(data["verdict"]).strip().lower()
+    if verdict not in ("higher", "lower", "equivalent"):
+        raise ValueError(f"'verdict' must be \"higher\", \"lower\" or \"equivalent\", got {data['verdict']!r}")
+    _check_score(data["similarity_score"], "similarity_score")
+    return {"verdict": verdict, "similarity_score": data["similarity_score"],
+            "rationale": str(data["rationale"]).strip()}
+
+
+def score_circles(score, filled="🔴", empty="⚪", total=10):
+    """One row of ``total`` circles, filled from the left in proportion to a 0–100 score."""
+    if not isinstance(score, (int, float)):
+        return ""
+    n = round(min(max(score, 0), 100) / 100 * total)
+    return filled * n + empty * (total - n)
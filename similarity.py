@@ -0,0 +1,83 @@
+"""Local TF-IDF similarity between framework levels.
+
+Runs entirely offline: every level is turned into a TF-IDF vector over word
+tokens and character n-grams, and the full Primary × Secondary cosine matrix
+comes out of a single matrix product. Used to give an instant provisional
+ranking and to shortlist which level pairs are worth sending to GPT.
+"""
+
+import re
+from collections import Counter
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+_word = re.compile(r"[a-z0-9]+")
+CHAR_NGRAMS = (3, 4, 5)
+
+
+def _features(text):
+    words = _word.findall(text.lower())
+    features = Counter(f"w:{w}" for w in words)
+    for w in words:
+        padded = f" {w} "
+        for n in CHAR_NGRAMS:
+            for i in range(len(padded) - n + 1):
+                features[f"c:{padded[i:i + n]}"] += 1
+    return features
+
+
+def level_text(descriptors):
+    if isinstance(descriptors, Mapping):
+        return " ".join(str(v) for v in descriptors.values())
+    return str(descriptors)
+
+
+def tfidf_matrix(documents):
+    """Return an L2-normalised (n_documents × n_features) TF-IDF matrix."""
+    counts = [_features(doc) for doc in documents]
+    vocabulary = {}
+    rows, cols, values = [], [], []
+    for row, feats in enumerate(counts):
+        for feat, count in feats.items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(feat, len(vocabulary)))
+            values.append(count)
+
+    tf = np.zeros((len(documents), max(len(vocabulary), 1)))
+    tf[rows, cols] = values
+    tf = np.log1p(tf)   # sublinear tf damps long repetitive descriptors
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1
+    weights = tf * idf
+
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return weights / norms
+
+
+def similarity_matrix(Primary_levels, Secondary_levels):
+    """Cosine similarity (0–100) with Primary levels as rows, Secondary levels as columns."""
+    primary_keys = sorted(Primary_levels)
+    secondary_keys = sorted(Secondary_levels)
+    documents = [level_text(Primary_levels[k]) for k in primary_keys] + [level_text(Secondary_levels[k]) for k in secondary_keys]
+
+    vectors = tfidf_matrix(documents)
+    scores = vectors[:len(primary_keys)] @ vectors[len(primary_keys):].T
+    return pd.DataFrame(np.round(scores * 100, 1), index=primary_keys, columns=secondary_keys)
+
+
+def rank_candidates(matrix, primary_level, top_k=None):
+    ranked = matrix.loc[primary_level].sort_values(ascending=False)
+    return ranked if top_k is None else ranked.head(top_k)
+
+
+def shortlist_pairs(matrix, top_k):
+    """Level pairs restricted to the ``top_k`` most similar Secondary levels per Primary level."""
+    return [
+        (p, s)
+        for p in matrix.index
+        for s in rank_candidates(matrix, p, top_k).index
+    ]